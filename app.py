@@ -1,21 +1,104 @@
 import os
+import io
+import json
+import time
 import uuid
-import shutil
-import tempfile
+import hashlib
+import threading
+from collections import namedtuple
 from pathlib import Path
-from flask import Flask, render_template, request, jsonify, send_file, session
+from flask import Flask, Response, render_template, request, jsonify, send_file, session
+from werkzeug.exceptions import HTTPException
 
-from utils.video_processor import extract_audio, replace_audio_track
-from utils.transcriber import transcribe_audio
-from utils.subtitle_generator import generate_subtitle_file
-from utils.translator import translate_subtitles
-from utils.audio_generator import generate_dubbed_audio
+from concurrent.futures import ThreadPoolExecutor
+from utils.transcriber import WHISPER_MODEL, transcribe_audio_stream, allowed_model_sizes, start_warmup, warmup_status
+from utils.cues import CueList, seconds_to_ms
+from utils.translator import StreamingTranslator, get_translation_cache
+from utils.translation_engines import get_translation_engine
+from utils.job_queue import FINISHED_STATES, JobQueue
+from utils.artifact_store import AUDIO_ARTIFACT, get_artifact_store, transcript_artifact, translation_artifact
+from utils.metrics import (
+    JOB_SECONDS, JOBS_FINISHED, JOBS_IN_FLIGHT, close_open_spans, end_span, registry as metrics_registry, start_span
+)
+from utils.session_store import SessionReaper, create_session_store, make_temp_dir, remove_temp_dir
+from utils.chunked_upload import (
+    UPLOAD_CHUNK_SIZE, UPLOAD_MAX_BYTES, ChecksumMismatch, OffsetMismatch,
+    committed_offset, create_upload, finalize_upload, write_chunk
+)
+# utils.video_processor, utils.chunked_transcriber and utils.audio_generator
+# pull in ffmpeg-python and numpy, so they are imported where they are first
+# used; boots and /health do not pay for them (faster-whisper itself is only
+# imported when a model is loaded)
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'videodub-pro-secret-key-2024')
 app.config['MAX_CONTENT_LENGTH'] = 500 * 1024 * 1024
 
-sessions_data = {}
+# Session data and job records live in a store shared by all worker processes
+session_store = create_session_store()
+SESSION_TTL = float(os.environ.get('SESSION_TTL', 6 * 3600))
+
+# A job whose record has not been refreshed for this long lost its worker
+JOB_HEARTBEAT_TIMEOUT = 60
+
+# By default ffmpeg pipes PCM straight into Whisper; set WRITE_AUDIO_WAV=1 to
+# also keep extracted_audio.wav in the session directory (e.g. for debugging)
+WRITE_AUDIO_WAV = os.environ.get('WRITE_AUDIO_WAV', '').lower() in ('1', 'true', 'yes')
+
+# Partial subtitles are written to the store at most this often
+SUBTITLE_FLUSH_SECONDS = 1.0
+
+# Preview renders cover this many seconds by default, scaled down to this height
+PREVIEW_SECONDS = float(os.environ.get('PREVIEW_SECONDS', 60))
+PREVIEW_HEIGHT = int(os.environ.get('PREVIEW_HEIGHT', 360))
+
+# Fine-grained progress events are logged at most this often per step
+PROGRESS_EVENT_SECONDS = 0.5
+
+# Event stream polling and keep-alive intervals
+EVENT_POLL_SECONDS = 0.5
+EVENT_HEARTBEAT_SECONDS = 15
+
+# Segment read back from a stored transcription
+CachedSegment = namedtuple('CachedSegment', ['start', 'end', 'text'])
+
+# Last job status logged as an event, per job run by this process
+_logged_statuses = {}
+_logged_statuses_lock = threading.Lock()
+
+def persist_job(job):
+    # Heartbeats refresh the record; only status changes become events
+    with _logged_statuses_lock:
+        previous = _logged_statuses.get(job.id)
+        changed = previous != job.status
+        if job.finished:
+            _logged_statuses.pop(job.id, None)
+        else:
+            _logged_statuses[job.id] = job.status
+    if changed:
+        if previous is not None:
+            JOBS_IN_FLIGHT.dec(kind=job.kind, status=previous)
+        if job.finished:
+            close_open_spans(job.trace, job.status)
+            JOBS_FINISHED.inc(kind=job.kind, status=job.status)
+            if job.started_at is not None:
+                JOB_SECONDS.observe(job.finished_at - job.started_at, kind=job.kind)
+        else:
+            JOBS_IN_FLIGHT.inc(kind=job.kind, status=job.status)
+    record = job.to_dict(include_result=True, include_trace=True)
+    session_store.save_job(record, job.owner)
+    if changed:
+        event_record = dict(record)
+        event_record.pop('trace')
+        session_store.add_event(job.id, {'type': 'job', 'job': event_record})
+
+# Background pipeline jobs; JOB_WORKERS bounds how many run at once
+job_queue = JobQueue(
+    max_workers=int(os.environ.get('JOB_WORKERS', 1)),
+    default_timeout=float(os.environ.get('JOB_TIMEOUT', 3600)),
+    on_update=persist_job,
+    cancel_check=lambda job: session_store.cancel_requested(job.id)
+)
 
 LANGUAGES = {
     "English": "en",
@@ -40,6 +123,16 @@ LANGUAGES = {
     "Malay": "ms"
 }
 
+def new_progress_status():
+    return {
+        'audio_extraction': 'pending',
+        'transcription': 'pending',
+        'translation': 'pending',
+        'subtitle_generation': 'pending',
+        'audio_generation': 'pending',
+        'video_merging': 'pending'
+    }
+
 def get_session_id():
     if 'session_id' not in session:
         session['session_id'] = str(uuid.uuid4())
@@ -47,71 +140,156 @@ def get_session_id():
 
 def get_session_data():
     session_id = get_session_id()
-    if session_id not in sessions_data:
-        sessions_data[session_id] = {
+    data = session_store.get(session_id)
+    if data is None:
+        data = {
             'temp_dir': None,
             'video_path': None,
+            'video_sha256': None,
             'audio_path': None,
-            'original_subtitle': None,
-            'translated_subtitle': None,
-            'output_video': None,
-            'original_subtitles_data': [],
-            'translated_subtitles_data': [],
-            'target_lang_code': None,
-            'progress_status': {
-                'audio_extraction': 'pending',
-                'transcription': 'pending',
-                'translation': 'pending',
-                'subtitle_generation': 'pending',
-                'audio_generation': 'pending',
-                'video_merging': 'pending'
-            }
+            'original_cues': None,
+            'targets': [],
+            'translations': {},
+            'job_id': None,
+            'upload': None,
+            'progress_status': new_progress_status()
         }
-    return sessions_data[session_id]
+        session_store.save(session_id, data)
+    return data
 
-def cleanup_session():
-    session_id = get_session_id()
-    if session_id in sessions_data:
-        data = sessions_data[session_id]
-        if data['temp_dir'] and os.path.exists(data['temp_dir']):
-            try:
-                shutil.rmtree(data['temp_dir'])
-            except Exception:
-                pass
-        del sessions_data[session_id]
+def save_session_data(data):
+    session_store.save(get_session_id(), data)
 
-def read_srt_file(srt_path):
-    import pysrt
-    try:
-        subs = pysrt.open(srt_path, encoding='utf-8')
-        subtitles_data = []
-        for sub in subs:
-            subtitles_data.append({
-                'index': sub.index,
-                'start': str(sub.start),
-                'end': str(sub.end),
-                'text': sub.text
-            })
-        return subtitles_data
-    except Exception as e:
-        return []
+def update_session(session_id, **changes):
+    return session_store.update(session_id, lambda data: data.update(changes))
 
-def save_edited_subtitles(subtitles_data, output_path):
-    import pysrt
-    try:
-        subs = pysrt.SubRipFile()
-        for sub_data in subtitles_data:
-            sub = pysrt.SubRipItem(
-                index=sub_data['index'],
-                start=sub_data['start'],
-                end=sub_data['end'],
-                text=sub_data['text']
-            )
-            subs.append(sub)
-        subs.save(output_path, encoding='utf-8')
-        return True
-    except Exception as e:
+def get_translation(data, lang_code=None):
+    """Translation entry of a target language; the first target by default"""
+    if not lang_code:
+        lang_code = data['targets'][0] if data.get('targets') else None
+    return data.get('translations', {}).get(lang_code)
+
+def update_translation(session_id, lang_code, **changes):
+    return session_store.update(session_id, lambda data: data['translations'][lang_code].update(changes))
+
+def log_step(job, step, status):
+    # Stage transitions double as the spans of the job trace
+    if status == 'processing':
+        start_span(job.trace, step)
+    elif status == 'completed':
+        end_span(job.trace, step)
+    session_store.add_event(job.id, {'type': 'stage', 'step': step, 'status': status})
+
+def set_progress(job, session_id, **steps):
+    data = session_store.update(session_id, lambda data: data['progress_status'].update(steps))
+    for step, status in steps.items():
+        log_step(job, step, status)
+    return data
+
+def progress_reporter(job, step):
+    """
+    Build a progress(done, total) callback that logs throttled progress events
+    
+    Progress is reported from inside long steps (ffmpeg runs, TTS), so the
+    callback raises JobCancelled there once the job is cancelled or times out.
+    """
+    last_logged = [0.0]
+    
+    def report(done, total):
+        job.check_cancelled()
+        now = time.time()
+        if done < total and now - last_logged[0] < PROGRESS_EVENT_SECONDS:
+            return
+        last_logged[0] = now
+        session_store.add_event(job.id, {
+            'type': 'progress',
+            'step': step,
+            'done': done,
+            'total': total,
+            'percent': round(100.0 * done / total, 1) if total else None
+        })
+    
+    return report
+
+def get_job_record(job_id):
+    """Return (record, owner) from this process's queue or the shared store"""
+    job = job_queue.get(job_id)
+    if job is not None:
+        return job.to_dict(include_result=True, include_trace=True), job.owner
+    return session_store.get_job(job_id)
+
+def is_job_active(record):
+    if record is None or record['status'] in FINISHED_STATES:
         return False
+    updated_at = record.get('updated_at')
+    return updated_at is None or time.time() - updated_at < JOB_HEARTBEAT_TIMEOUT
+
+def get_active_job(data):
+    if not data.get('job_id'):
+        return None
+    record, _ = get_job_record(data['job_id'])
+    return record if is_job_active(record) else None
+
+def wait_for_job(job, job_id, poll_interval=0.5):
+    """Block a running job until another job (possibly in another worker) is done"""
+    while is_job_active(get_job_record(job_id)[0]):
+        job.check_cancelled()
+        time.sleep(poll_interval)
+
+def request_job_cancel(job_id):
+    # The job may be running in another worker process, which polls the flag
+    if not job_queue.cancel(job_id):
+        session_store.request_cancel(job_id)
+
+def adopt_video(session_id, video_path, video_sha256):
+    """Reference the stored copy of an uploaded video, storing it if it is new"""
+    store = get_artifact_store()
+    if store is None:
+        return video_path
+    store.acquire(video_sha256, session_id)
+    return store.adopt_video(video_sha256, video_path)
+
+def release_video(session_id, data):
+    """Drop a session's reference to its stored video"""
+    store = get_artifact_store()
+    if store is not None and data.get('video_sha256'):
+        store.release(session_id, data['video_sha256'])
+
+session_reaper = SessionReaper(
+    session_store, SESSION_TTL,
+    interval=float(os.environ.get('SESSION_REAP_INTERVAL', 600)),
+    is_busy=lambda data: get_active_job(data) is not None,
+    on_expire=release_video
+)
+
+@app.before_request
+def start_background_threads():
+    session_reaper.start()
+    metrics_registry.start()
+
+def cleanup_session():
+    session_id = get_session_id()
+    data = session_store.delete(session_id)
+    if data is not None:
+        job = get_active_job(data)
+        if job is not None:
+            request_job_cancel(job['id'])
+        remove_temp_dir(data['temp_dir'])
+        release_video(session_id, data)
+
+def send_cues(cues, download_name):
+    # SRT and VTT are export formats, rendered from the cue store on request
+    if request.args.get('format') == 'vtt':
+        content, mimetype = cues.to_vtt(), 'text/vtt'
+        download_name = os.path.splitext(download_name)[0] + '.vtt'
+    else:
+        content, mimetype = cues.to_srt(), 'text/plain'
+    return send_file(
+        io.BytesIO(content.encode('utf-8')),
+        mimetype=mimetype,
+        as_attachment=True,
+        download_name=download_name
+    )
 
 @app.route('/')
 def index():
@@ -133,155 +311,743 @@ def upload_video():
         
         data = get_session_data()
         
-        if data['temp_dir'] and os.path.exists(data['temp_dir']):
-            shutil.rmtree(data['temp_dir'])
+        if get_active_job(data) is not None:
+            return jsonify({'success': False, 'error': 'A job is already running for this session'}), 409
+        
+        session_id = get_session_id()
+        remove_temp_dir(data['temp_dir'])
+        release_video(session_id, data)
         
-        temp_dir = tempfile.mkdtemp()
+        temp_dir = make_temp_dir()
         data['temp_dir'] = temp_dir
         
+        # Hash while saving so a repeat upload can reuse earlier work
         video_path = os.path.join(temp_dir, "input_video.mp4")
-        video_file.save(video_path)
-        data['video_path'] = video_path
-        
-        data['progress_status'] = {
-            'audio_extraction': 'pending',
-            'transcription': 'pending',
-            'translation': 'pending',
-            'subtitle_generation': 'pending',
-            'audio_generation': 'pending',
-            'video_merging': 'pending'
-        }
+        hasher = hashlib.sha256()
+        with open(video_path, 'wb') as f:
+            for block in iter(lambda: video_file.stream.read(1024 * 1024), b''):
+                hasher.update(block)
+                f.write(block)
+        data['video_sha256'] = hasher.hexdigest()
+        data['video_path'] = adopt_video(session_id, video_path, data['video_sha256'])
+        data['audio_path'] = None
+        data['upload'] = None
+        
+        data['progress_status'] = new_progress_status()
+        save_session_data(data)
         
         return jsonify({'success': True, 'message': 'Video uploaded successfully'})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def find_upload(data, upload_id):
+    upload = data.get('upload')
+    if upload and upload['id'] == upload_id:
+        return upload
+    return None
+
+@app.route('/api/upload/init', methods=['POST'])
+def init_upload():
+    try:
+        req_data = request.get_json() or {}
+        try:
+            size = int(req_data.get('size', 0))
+        except (TypeError, ValueError):
+            size = 0
+        if size <= 0:
+            return jsonify({'success': False, 'error': 'A positive file size is required'}), 400
+        if size > UPLOAD_MAX_BYTES:
+            return jsonify({'success': False, 'error': 'File is too large'}), 413
+        
+        data = get_session_data()
+        
+        if get_active_job(data) is not None:
+            return jsonify({'success': False, 'error': 'A job is already running for this session'}), 409
+        
+        remove_temp_dir(data['temp_dir'])
+        release_video(get_session_id(), data)
+        
+        temp_dir = make_temp_dir()
+        upload_id = str(uuid.uuid4())
+        video_path = os.path.join(temp_dir, "input_video.mp4")
+        create_upload(video_path)
+        
+        data['temp_dir'] = temp_dir
+        data['video_path'] = None
+        data['video_sha256'] = None
+        data['audio_path'] = None
+        data['upload'] = {'id': upload_id, 'path': video_path, 'size': size, 'sha256': req_data.get('sha256')}
+        data['progress_status'] = new_progress_status()
+        save_session_data(data)
+        
+        return jsonify({'success': True, 'upload_id': upload_id, 'offset': 0, 'chunk_size': UPLOAD_CHUNK_SIZE}), 201
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/upload/<upload_id>', methods=['GET'])
+def get_upload_status(upload_id):
+    upload = find_upload(get_session_data(), upload_id)
+    if upload is None:
+        return jsonify({'success': False, 'error': 'Upload not found'}), 404
+    return jsonify({'success': True, 'offset': committed_offset(upload['path']), 'size': upload['size']})
+
+@app.route('/api/upload/<upload_id>', methods=['PUT'])
+def put_upload_chunk(upload_id):
+    offset = request.args.get('offset', type=int)
+    if offset is None:
+        return jsonify({'success': False, 'error': 'An offset is required'}), 400
+    
+    upload = find_upload(get_session_data(), upload_id)
+    if upload is None:
+        return jsonify({'success': False, 'error': 'Upload not found'}), 404
+    
+    # The body is streamed into the file instead of being spooled by Flask
+    try:
+        new_offset = write_chunk(upload_id, upload['path'], offset, request.stream, upload['size'],
+                                 chunk_sha256=request.headers.get('X-Chunk-SHA256'))
+    except OffsetMismatch as e:
+        return jsonify({'success': False, 'error': str(e), 'offset': e.expected}), 409
+    except ChecksumMismatch as e:
+        return jsonify({'success': False, 'error': str(e), 'offset': committed_offset(upload['path'])}), 422
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e), 'offset': committed_offset(upload['path'])}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e), 'offset': committed_offset(upload['path'])}), 500
+    
+    return jsonify({'success': True, 'offset': new_offset})
+
+def extract_audio_cached(job, session_id, data):
+    """Extract the session video's audio to a WAV, reusing a stored one"""
+    store = get_artifact_store()
+    video_sha256 = data.get('video_sha256') if store is not None else None
+    audio_path = store.get(video_sha256, AUDIO_ARTIFACT) if video_sha256 else None
+    if audio_path is None:
+        from utils.video_processor import extract_audio
+        audio_path = os.path.join(data['temp_dir'], "extracted_audio.wav")
+        extract_audio(data['video_path'], audio_path, progress=progress_reporter(job, 'audio_extraction'))
+        if video_sha256:
+            audio_path = store.put_file(video_sha256, AUDIO_ARTIFACT, audio_path)
+    update_session(session_id, audio_path=audio_path)
+    return audio_path
+
+def run_extraction(job, session_id):
+    data = session_store.get(session_id)
+    try:
+        set_progress(job, session_id, audio_extraction='processing')
+        extract_audio_cached(job, session_id, data)
+        set_progress(job, session_id, audio_extraction='completed')
+        return {'message': 'Audio extracted'}
+    except Exception:
+        set_progress(job, session_id, audio_extraction='pending')
+        raise
+
+@app.route('/api/upload/<upload_id>/finalize', methods=['POST'])
+def finalize_chunked_upload(upload_id):
+    try:
+        req_data = request.get_json(silent=True) or {}
+        data = get_session_data()
+        upload = find_upload(data, upload_id)
+        if upload is None:
+            return jsonify({'success': False, 'error': 'Upload not found'}), 404
+        
+        try:
+            checksum = finalize_upload(upload_id, upload['path'], upload['size'],
+                                       req_data.get('sha256') or upload.get('sha256'))
+        except ChecksumMismatch as e:
+            return jsonify({'success': False, 'error': str(e)}), 422
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e), 'offset': committed_offset(upload['path'])}), 409
+        
+        session_id = get_session_id()
+        # The chunked upload hashed the file as it arrived
+        video_path = adopt_video(session_id, upload['path'], checksum)
+        update_session(session_id, video_path=video_path, video_sha256=checksum, upload=None)
+        
+        # A WAV extraction starts right away instead of waiting for stage 1;
+        # without it stage 1 decodes the audio while transcribing
+        job_id = None
+        if WRITE_AUDIO_WAV:
+            job = job_queue.submit('extract', run_extraction, session_id, owner=session_id)
+            update_session(session_id, job_id=job.id)
+            job_id = job.id
+        
+        return jsonify({'success': True, 'sha256': checksum, 'job_id': job_id,
+                        'message': 'Video uploaded successfully'})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def run_stage1(job, session_id, target_languages, source_language, model_size=None, prefetch_job_id=None):
+    from utils.chunked_transcriber import TRANSCRIBE_PROCESSES, transcribe_audio_parallel, transcribe_media_stream
+    from utils.video_processor import decode_audio
+    try:
+        if prefetch_job_id:
+            wait_for_job(job, prefetch_job_id)
+        data = session_store.get(session_id)
+        video_path = data['video_path']
+        
+        # A video uploaded before may already have been transcribed with this
+        # model; parallel transcription always runs the default model
+        store = get_artifact_store()
+        video_sha256 = data.get('video_sha256') if store is not None else None
+        model_key = WHISPER_MODEL if TRANSCRIBE_PROCESSES > 1 else (model_size or WHISPER_MODEL)
+        transcript = store.get_json(video_sha256, transcript_artifact(model_key)) if video_sha256 else None
+        
+        audio_path = data['audio_path']
+        if transcript is not None or (audio_path and os.path.exists(audio_path)):
+            set_progress(job, session_id, audio_extraction='completed')
+        elif WRITE_AUDIO_WAV:
+            set_progress(job, session_id, audio_extraction='processing')
+            audio_path = extract_audio_cached(job, session_id, data)
+            set_progress(job, session_id, audio_extraction='completed')
+        else:
+            audio_path = None
+            set_progress(job, session_id, audio_extraction='processing')
+        job.check_cancelled()
+        
+        set_progress(job, session_id, transcription='processing')
+        transcription_progress = progress_reporter(job, 'transcription')
+        streamed = False
+        if transcript is not None:
+            language = transcript['language']
+            segments = [CachedSegment(*segment) for segment in transcript['segments']]
+        elif audio_path is None and TRANSCRIBE_PROCESSES > 1:
+            # Worker processes need the whole track, so it is decoded into memory
+            samples = decode_audio(video_path)
+            set_progress(job, session_id, audio_extraction='completed')
+            language, segments = transcribe_audio_parallel(None, samples=samples, progress=transcription_progress)
+        elif audio_path is None:
+            # ffmpeg decodes while Whisper transcribes, one chunk at a time
+            language, segments = transcribe_media_stream(video_path, model_size, progress=transcription_progress)
+            streamed = True
+        elif TRANSCRIBE_PROCESSES > 1:
+            language, segments = transcribe_audio_parallel(audio_path, progress=transcription_progress)
+        else:
+            language, segments = transcribe_audio_stream(audio_path, model_size, progress=transcription_progress)
+        
+        target_codes = [LANGUAGES[name] for name in target_languages]
+        source_lang_code = LANGUAGES.get(source_language, 'en')
+        original_cues = CueList()
+        translated_cues = {code: CueList() for code in target_codes}
+        translations = {
+            code: {
+                'language': name,
+                'cues': None,
+                'dubbed_audio': None,
+                'output_video': None,
+                'preview_video': None
+            }
+            for name, code in zip(target_languages, target_codes)
+        }
+        # Translations stored with the transcription are replayed, not redone
+        engine_name = get_translation_engine().name
+        stored_texts = {}
+        if transcript is not None:
+            for code in target_codes:
+                texts = store.get_json(video_sha256,
+                                       translation_artifact(model_key, engine_name, source_lang_code, code))
+                if texts is not None and len(texts) == len(segments):
+                    stored_texts[code] = texts
+        recorded_segments = []
+        last_flush = [0.0]
+        
+        def publish_cues(force=False):
+            now = time.time()
+            if force or now - last_flush[0] >= SUBTITLE_FLUSH_SECONDS:
+                last_flush[0] = now
+                for code, entry in translations.items():
+                    entry['cues'] = translated_cues[code].to_dict()
+                update_session(session_id, original_cues=original_cues.to_dict(),
+                               targets=target_codes, translations=translations)
+        
+        # Segments are added and translated as Whisper emits them, so partial
+        # subtitles are visible through /api/subtitles meanwhile. Every target
+        # language has its own translator thread, all fed from the one
+        # transcription.
+        publish_cues(force=True)
+        set_progress(job, session_id, subtitle_generation='processing', translation='processing')
+        translation_progress = progress_reporter(job, 'translation')
+        progress_lock = threading.Lock()
+        
+        def make_callback(code):
+            def on_translated(position, translated_text):
+                translated_cues[code].append(original_cues.starts[position], original_cues.ends[position],
+                                             translated_text)
+                with progress_lock:
+                    # The total grows until transcription has finished
+                    done = sum(len(cues) for cues in translated_cues.values())
+                    translation_progress(done, len(original_cues) * len(target_codes))
+            return on_translated
+        
+        translators = {}
+        replays = {}
+        try:
+            for code in target_codes:
+                if code in stored_texts:
+                    replays[code] = make_callback(code)
+                else:
+                    translators[code] = StreamingTranslator(code, source_lang_code, make_callback(code))
+            for segment in segments:
+                job.check_cancelled()
+                recorded_segments.append([segment.start, segment.end, segment.text])
+                position = original_cues.append(seconds_to_ms(segment.start), seconds_to_ms(segment.end),
+                                                segment.text)
+                for translator in translators.values():
+                    translator.add(original_cues.texts[position])
+                for code, on_translated in replays.items():
+                    on_translated(position, stored_texts[code][position])
+                publish_cues()
+        finally:
+            errors = []
+            for translator in translators.values():
+                try:
+                    translator.close()
+                except Exception as e:
+                    errors.append(e)
+            if errors:
+                raise errors[0]
+        
+        publish_cues(force=True)
+        if streamed:
+            set_progress(job, session_id, audio_extraction='completed')
+        if video_sha256:
+            if transcript is None:
+                store.put_json(video_sha256, transcript_artifact(model_key),
+                               {'language': language, 'segments': recorded_segments})
+            for code, translator in translators.items():
+                # Lines that fell back to the source text would be replayed
+                # for good, so only complete translations are stored
+                if translator.fallbacks == 0:
+                    store.put_json(video_sha256, translation_artifact(model_key, engine_name, source_lang_code, code),
+                                   translated_cues[code].texts)
+        set_progress(job, session_id, transcription='completed', subtitle_generation='completed',
+                     translation='completed')
+        
+        return {
+            'original_subtitles': original_cues.to_client(),
+            'translated_subtitles': translated_cues[target_codes[0]].to_client(),
+            'translations': {code: cues.to_client() for code, cues in translated_cues.items()},
+            'message': 'Stage 1 completed successfully'
+        }
+    except Exception:
+        session_store.update(session_id, lambda data: data.update(progress_status=new_progress_status()))
+        raise
+
 @app.route('/api/process/stage1', methods=['POST'])
 def process_stage1():
     try:
         req_data = request.get_json()
-        target_language = req_data.get('target_language', 'Hindi')
+        # Several targets are translated from one transcription; a single
+        # target_language is still accepted
+        target_languages = req_data.get('target_languages') or [req_data.get('target_language', 'Hindi')]
         source_language = req_data.get('source_language', 'English')
+        model_size = req_data.get('model_size')
+        
+        if not isinstance(target_languages, list):
+            return jsonify({'success': False, 'error': 'target_languages must be a list'}), 400
+        unknown = [name for name in target_languages if name not in LANGUAGES]
+        if unknown:
+            return jsonify({'success': False, 'error': f"Unsupported target language: {', '.join(map(str, unknown))}"}), 400
+        target_languages = list(dict.fromkeys(target_languages))
+        
+        if model_size is not None and model_size not in allowed_model_sizes():
+            return jsonify({'success': False, 'error': f'Unsupported model size: {model_size}'}), 400
         
         data = get_session_data()
         
         if not data['video_path'] or not os.path.exists(data['video_path']):
             return jsonify({'success': False, 'error': 'No video uploaded'}), 400
         
-        temp_dir = data['temp_dir']
-        video_path = data['video_path']
+        # Stage 1 may queue behind the audio extraction started by an upload
+        active_job = get_active_job(data)
+        if active_job is not None and active_job['kind'] != 'extract':
+            return jsonify({'success': False, 'error': 'A job is already running for this session'}), 409
         
-        data['progress_status']['audio_extraction'] = 'processing'
-        audio_path = os.path.join(temp_dir, "extracted_audio.wav")
-        extract_audio(video_path, audio_path)
-        data['audio_path'] = audio_path
-        data['progress_status']['audio_extraction'] = 'completed'
+        session_id = get_session_id()
+        job = job_queue.submit('stage1', run_stage1, session_id, target_languages, source_language, model_size,
+                               prefetch_job_id=active_job['id'] if active_job else None, owner=session_id)
+        update_session(session_id, job_id=job.id)
         
-        data['progress_status']['transcription'] = 'processing'
-        language, segments = transcribe_audio(audio_path)
-        data['progress_status']['transcription'] = 'completed'
-        
-        data['progress_status']['subtitle_generation'] = 'processing'
-        original_subtitle_path = os.path.join(temp_dir, f"subtitles_{language}.srt")
-        generate_subtitle_file(segments, original_subtitle_path)
-        data['original_subtitle'] = original_subtitle_path
-        data['progress_status']['subtitle_generation'] = 'completed'
-        
-        data['progress_status']['translation'] = 'processing'
-        target_lang_code = LANGUAGES.get(target_language, 'hi')
-        source_lang_code = LANGUAGES.get(source_language, 'en')
-        translated_subtitle_path = os.path.join(temp_dir, f"subtitles_{target_lang_code}.srt")
-        translate_subtitles(original_subtitle_path, translated_subtitle_path, target_lang_code, source_lang_code)
-        data['translated_subtitle'] = translated_subtitle_path
-        data['target_lang_code'] = target_lang_code
-        data['progress_status']['translation'] = 'completed'
-        
-        data['original_subtitles_data'] = read_srt_file(original_subtitle_path)
-        data['translated_subtitles_data'] = read_srt_file(translated_subtitle_path)
-        
-        return jsonify({
-            'success': True,
-            'original_subtitles': data['original_subtitles_data'],
-            'translated_subtitles': data['translated_subtitles_data'],
-            'message': 'Stage 1 completed successfully'
-        })
+        return jsonify({'success': True, 'job_id': job.id, 'message': 'Stage 1 queued'}), 202
     except Exception as e:
-        data = get_session_data()
-        data['progress_status'] = {k: 'pending' for k in data['progress_status']}
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/progress')
 def get_progress():
     data = get_session_data()
-    return jsonify(data['progress_status'])
+    record = get_job_record(data['job_id'])[0] if data.get('job_id') else None
+    if record is not None:
+        record.pop('result', None)
+    progress = dict(data['progress_status'])
+    progress['job'] = record
+    return jsonify(progress)
+
+@app.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    record, owner = get_job_record(job_id)
+    if record is None or owner != get_session_id():
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    # Stage spans with timings are included on request
+    if request.args.get('trace', '').lower() not in ('1', 'true', 'yes'):
+        record.pop('trace', None)
+    return jsonify({'success': True, 'job': record})
+
+def format_event(event, event_id=None):
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines.append(f"event: {event['type']}")
+    lines.append(f"data: {json.dumps(event)}")
+    return "\n".join(lines) + "\n\n"
+
+@app.route('/api/jobs/<job_id>/events')
+def stream_job_events(job_id):
+    """
+    Server-Sent Events stream of a job's stage, progress and status events
+    
+    Events are read from the shared store, so the stream can be served by a
+    different worker than the one running the job. Reconnecting clients send
+    Last-Event-ID and only receive what they missed.
+    """
+    record, owner = get_job_record(job_id)
+    if record is None or owner != get_session_id():
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or 0)
+    except ValueError:
+        last_event_id = 0
+    
+    def generate():
+        after_id = last_event_id
+        last_sent = time.time()
+        finished = False
+        yield "retry: 3000\n\n"
+        while True:
+            record = get_job_record(job_id)[0]
+            active = is_job_active(record)
+            # Read events after the status so none logged before finishing are missed
+            events = session_store.get_events(job_id, after_id)
+            for event_id, event in events:
+                after_id = event_id
+                if event['type'] == 'job' and event['job']['status'] in FINISHED_STATES:
+                    finished = True
+                yield format_event(event, event_id)
+            if events:
+                last_sent = time.time()
+            if not active:
+                if not finished and record is not None:
+                    # Final status was sent before a reconnect, or the worker was lost
+                    if record['status'] not in FINISHED_STATES:
+                        record = dict(record, status='failed', error='Job worker stopped responding')
+                    record.pop('updated_at', None)
+                    record.pop('trace', None)
+                    yield format_event({'type': 'job', 'job': record})
+                return
+            if time.time() - last_sent >= EVENT_HEARTBEAT_SECONDS:
+                last_sent = time.time()
+                yield ": heartbeat\n\n"
+            time.sleep(EVENT_POLL_SECONDS)
+    
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    record, owner = get_job_record(job_id)
+    if record is None or owner != get_session_id():
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    if not is_job_active(record):
+        return jsonify({'success': False, 'error': 'Job already finished'}), 409
+    request_job_cancel(job_id)
+    return jsonify({'success': True, 'message': 'Cancellation requested'})
+
+@app.route('/api/jobs/metrics')
+def get_job_metrics():
+    return jsonify(job_queue.metrics())
+
+@app.route('/api/cache/stats')
+def get_cache_stats():
+    from utils.audio_generator import get_clip_cache
+    clip_cache = get_clip_cache()
+    translation_cache = get_translation_cache()
+    artifact_store = get_artifact_store()
+    return jsonify({
+        'tts_clips': clip_cache.stats() if clip_cache else None,
+        'translations': translation_cache.stats() if translation_cache else None,
+        'artifacts': artifact_store.stats() if artifact_store else None
+    })
+
+@app.route('/api/subtitles')
+def get_subtitles():
+    data = get_session_data()
+    job = get_active_job(data)
+    primary = get_translation(data)
+    return jsonify({
+        'success': True,
+        'complete': job is None,
+        'original_subtitles': CueList.from_dict(data.get('original_cues')).to_client(),
+        'translated_subtitles': CueList.from_dict(primary['cues']).to_client() if primary else [],
+        'translations': {code: CueList.from_dict(entry['cues']).to_client()
+                         for code, entry in data.get('translations', {}).items()}
+    })
 
 @app.route('/api/save-edits', methods=['POST'])
 def save_edits():
     try:
         req_data = request.get_json()
         edited_subtitles = req_data.get('edited_subtitles', [])
+        language = req_data.get('language')
+        if not isinstance(edited_subtitles, list):
+            return jsonify({'success': False, 'error': 'edited_subtitles must be a list'}), 400
         
-        data = get_session_data()
+        # Edits address cues by the 1-based index the client was sent
+        edits = []
+        for i, edit in enumerate(edited_subtitles):
+            if not isinstance(edit, dict) or not isinstance(edit.get('text'), str):
+                return jsonify({'success': False, 'error': f"Edit {i} has no text", 'position': i}), 400
+            try:
+                index = int(edit.get('index', i + 1))
+            except (TypeError, ValueError):
+                return jsonify({'success': False, 'error': f"Edit {i} has an invalid index", 'position': i}), 400
+            edits.append((index - 1, edit['text']))
         
-        if not data['translated_subtitle']:
-            return jsonify({'success': False, 'error': 'No subtitles to edit'}), 400
+        session_id = get_session_id()
+        get_session_data()
+        outcome = []
         
-        for i, edit in enumerate(edited_subtitles):
-            if i < len(data['translated_subtitles_data']):
-                data['translated_subtitles_data'][i]['text'] = edit['text']
+        def apply_edits(data):
+            # Stage 1 publishes cues and stage 2 records its outputs into the
+            # same session, so edits wait until neither is queued or running
+            active_job = get_active_job(data)
+            if active_job is not None and active_job['kind'] in ('stage1', 'stage2'):
+                outcome.append('busy')
+                return
+            translation = get_translation(data, language)
+            if not translation or not translation['cues']:
+                outcome.append('missing')
+                return
+            cues = CueList.from_dict(translation['cues'])
+            for position, text in edits:
+                if 0 <= position < len(cues):
+                    cues.set_text(position, text)
+            translation['cues'] = cues.to_dict()
+            outcome.append('saved')
         
-        success = save_edited_subtitles(data['translated_subtitles_data'], data['translated_subtitle'])
+        # Applied inside the store's read-modify-write, so fields a job writes
+        # meanwhile are not lost
+        session_store.update(session_id, apply_edits)
         
-        if success:
-            return jsonify({'success': True, 'message': 'Edits saved successfully'})
-        else:
-            return jsonify({'success': False, 'error': 'Failed to save edits'}), 500
+        if outcome == ['busy']:
+            return jsonify({'success': False, 'error': 'A job is running for this session'}), 409
+        if outcome != ['saved']:
+            return jsonify({'success': False, 'error': 'No subtitles to edit'}), 400
+        return jsonify({'success': True, 'message': 'Edits saved successfully'})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def run_stage2(job, session_id, combine=False):
+    from utils.audio_generator import generate_dubbed_audio
+    from utils.video_processor import mux_multitrack, replace_audio_track
+    try:
+        data = session_store.get(session_id)
+        temp_dir = data['temp_dir']
+        targets = data['targets']
+        
+        set_progress(job, session_id, audio_generation='processing')
+        audio_progress = progress_reporter(job, 'audio_generation')
+        cues_done = {code: (0, 0) for code in targets}
+        progress_lock = threading.Lock()
+        
+        def dub(code):
+            def report(done, total):
+                job.check_cancelled()
+                with progress_lock:
+                    cues_done[code] = (done, total)
+                    audio_progress(sum(d for d, _ in cues_done.values()), sum(t for _, t in cues_done.values()))
+            
+            dubbed_audio_path = os.path.join(temp_dir, f"dubbed_audio_{code}.wav")
+            # A previous dub of this session is patched where only some cues changed
+            try:
+                result = generate_dubbed_audio(CueList.from_dict(data['translations'][code]['cues']),
+                                               dubbed_audio_path, code, progress=report)
+            except Exception:
+                # The generator wraps errors, including the JobCancelled raised by report
+                job.check_cancelled()
+                raise
+            update_translation(session_id, code, dubbed_audio=dubbed_audio_path)
+            return dubbed_audio_path, result
+        
+        # Languages are synthesized concurrently; TTS engines mostly wait on I/O
+        with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+            dubs = dict(zip(targets, executor.map(dub, targets)))
+        set_progress(job, session_id, audio_generation='completed')
+        job.check_cancelled()
+        
+        set_progress(job, session_id, video_merging='processing')
+        merge_progress = progress_reporter(job, 'video_merging')
+        if combine:
+            # One MP4 holds the video once, with an audio and subtitle stream per language
+            output_video_path = os.path.join(temp_dir, "output_dubbed_video.mp4")
+            tracks = []
+            for code in targets:
+                # The muxer reads subtitles from an SRT export of the cue store
+                subtitle_path = os.path.join(temp_dir, f"subtitles_{code}.srt")
+                CueList.from_dict(data['translations'][code]['cues']).write(subtitle_path)
+                tracks.append({'language': code, 'audio': dubs[code][0], 'subtitle': subtitle_path})
+            mux_multitrack(data['video_path'], tracks, output_video_path, progress=merge_progress)
+            for code in targets:
+                update_translation(session_id, code, output_video=output_video_path)
+        else:
+            for position, code in enumerate(targets):
+                job.check_cancelled()
+                output_video_path = os.path.join(temp_dir, f"output_dubbed_video_{code}.mp4")
+                replace_audio_track(data['video_path'], dubs[code][0], output_video_path,
+                                    progress=lambda done, total: merge_progress(position * total + done,
+                                                                                len(targets) * total))
+                update_translation(session_id, code, output_video=output_video_path)
+        set_progress(job, session_id, video_merging='completed')
+        
+        return {
+            'message': 'Video dubbing completed successfully',
+            'combined': combine,
+            'languages': targets,
+            'incremental': all(result['incremental'] for _, result in dubs.values()),
+            'cues_rendered': sum(result['cues_rendered'] for _, result in dubs.values())
+        }
+    except Exception:
+        set_progress(job, session_id, audio_generation='pending', video_merging='pending')
+        raise
+
 @app.route('/api/process/stage2', methods=['POST'])
 def process_stage2():
     try:
+        req_data = request.get_json(silent=True) or {}
         data = get_session_data()
         
-        if not data['translated_subtitle'] or not os.path.exists(data['translated_subtitle']):
+        translations = [get_translation(data, code) for code in data.get('targets', [])]
+        if not translations or not all(entry and entry['cues'] and entry['cues']['text'] for entry in translations):
             return jsonify({'success': False, 'error': 'No translated subtitles found'}), 400
         
-        temp_dir = data['temp_dir']
-        
-        data['progress_status']['audio_generation'] = 'processing'
-        dubbed_audio_path = os.path.join(temp_dir, "dubbed_audio.wav")
-        generate_dubbed_audio(data['translated_subtitle'], dubbed_audio_path, data['target_lang_code'])
-        data['progress_status']['audio_generation'] = 'completed'
+        if get_active_job(data) is not None:
+            return jsonify({'success': False, 'error': 'A job is already running for this session'}), 409
         
-        data['progress_status']['video_merging'] = 'processing'
-        output_video_path = os.path.join(temp_dir, "output_dubbed_video.mp4")
-        replace_audio_track(data['video_path'], dubbed_audio_path, output_video_path)
-        data['output_video'] = output_video_path
-        data['progress_status']['video_merging'] = 'completed'
+        session_id = get_session_id()
+        job = job_queue.submit('stage2', run_stage2, session_id, bool(req_data.get('combine', False)),
+                               owner=session_id)
+        update_session(session_id, job_id=job.id)
         
-        return jsonify({
-            'success': True,
-            'message': 'Video dubbing completed successfully'
-        })
+        return jsonify({'success': True, 'job_id': job.id, 'message': 'Stage 2 queued'}), 202
     except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def run_preview(job, session_id, code, start, end):
+    from utils.audio_generator import generate_dubbed_audio
+    from utils.video_processor import render_preview
+    data = session_store.get(session_id)
+    translation = data['translations'][code]
+    # Only the cues starting in the window are dubbed; the clip cache keeps
+    # what they synthesize for the full render
+    cues = CueList.from_dict(translation['cues']).window(seconds_to_ms(start), seconds_to_ms(end))
+    
+    log_step(job, 'preview_audio', 'processing')
+    audio_path = os.path.join(data['temp_dir'], f"preview_audio_{code}.wav")
+    try:
+        result = generate_dubbed_audio(cues, audio_path, code, progress=progress_reporter(job, 'preview_audio'))
+    except Exception:
+        job.check_cancelled()
+        raise
+    log_step(job, 'preview_audio', 'completed')
+    job.check_cancelled()
+    
+    log_step(job, 'preview_video', 'processing')
+    preview_path = os.path.join(data['temp_dir'], f"preview_{code}.mp4")
+    duration = render_preview(data['video_path'], audio_path, preview_path, start, end - start,
+                              height=PREVIEW_HEIGHT, progress=progress_reporter(job, 'preview_video'))
+    update_translation(session_id, code, preview_video=preview_path)
+    log_step(job, 'preview_video', 'completed')
+    
+    return {
+        'message': 'Preview rendered',
+        'language': code,
+        'start': start,
+        'end': start + duration,
+        'cues': len(cues),
+        'cues_rendered': result['cues_rendered']
+    }
+
+@app.route('/api/process/preview', methods=['POST'])
+def process_preview():
+    try:
+        req_data = request.get_json(silent=True) or {}
         data = get_session_data()
-        data['progress_status']['audio_generation'] = 'pending'
-        data['progress_status']['video_merging'] = 'pending'
+        
+        translation = get_translation(data, req_data.get('language'))
+        if not translation or not translation['cues']:
+            return jsonify({'success': False, 'error': 'No translated subtitles found'}), 400
+        
+        try:
+            start = float(req_data.get('start', 0))
+            end = float(req_data.get('end', start + PREVIEW_SECONDS))
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'error': 'start and end must be numbers of seconds'}), 400
+        if start < 0 or end <= start:
+            return jsonify({'success': False, 'error': 'The preview window must satisfy 0 <= start < end'}), 400
+        
+        if get_active_job(data) is not None:
+            return jsonify({'success': False, 'error': 'A job is already running for this session'}), 409
+        
+        session_id = get_session_id()
+        code = req_data.get('language') or data['targets'][0]
+        job = job_queue.submit('preview', run_preview, session_id, code, start, end, owner=session_id)
+        update_session(session_id, job_id=job.id)
+        
+        return jsonify({'success': True, 'job_id': job.id, 'message': 'Preview queued'}), 202
+    except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def send_video(path, download_name):
+    # send_file answers Range, If-Range and If-None-Match itself. The ETag
+    # follows the file's mtime and size, and outputs are swapped in
+    # atomically, so a resumed download never mixes two renders.
+    response = send_file(
+        path,
+        mimetype='video/mp4',
+        as_attachment=request.args.get('inline') != '1',
+        download_name=download_name,
+        conditional=True,
+        etag=True
+    )
+    # Revalidated on every use (no-cache) and specific to the session
+    response.cache_control.private = True
+    response.vary.add('Cookie')
+    return response
+
 @app.route('/api/download/video')
 def download_video():
     try:
         data = get_session_data()
-        if data['output_video'] and os.path.exists(data['output_video']):
-            return send_file(
-                data['output_video'],
-                mimetype='video/mp4',
-                as_attachment=True,
-                download_name='dubbed_video.mp4'
-            )
+        language = request.args.get('language')
+        translation = get_translation(data, language)
+        output_video = translation['output_video'] if translation else None
+        if output_video and os.path.exists(output_video):
+            return send_video(output_video, f'dubbed_video_{language}.mp4' if language else 'dubbed_video.mp4')
         return jsonify({'success': False, 'error': 'No video available'}), 404
+    except HTTPException:
+        # 416 for an unsatisfiable range
+        raise
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/download/preview')
+def download_preview():
+    try:
+        data = get_session_data()
+        language = request.args.get('language')
+        translation = get_translation(data, language)
+        preview_video = translation.get('preview_video') if translation else None
+        if preview_video and os.path.exists(preview_video):
+            return send_video(preview_video, f'preview_{language}.mp4' if language else 'preview.mp4')
+        return jsonify({'success': False, 'error': 'No preview available'}), 404
+    except HTTPException:
+        raise
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -289,13 +1055,8 @@ def download_video():
 def download_original_srt():
     try:
         data = get_session_data()
-        if data['original_subtitle'] and os.path.exists(data['original_subtitle']):
-            return send_file(
-                data['original_subtitle'],
-                mimetype='text/plain',
-                as_attachment=True,
-                download_name='original_subtitles.srt'
-            )
+        if data.get('original_cues'):
+            return send_cues(CueList.from_dict(data['original_cues']), 'original_subtitles.srt')
         return jsonify({'success': False, 'error': 'No subtitles available'}), 404
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -304,13 +1065,11 @@ def download_original_srt():
 def download_translated_srt():
     try:
         data = get_session_data()
-        if data['translated_subtitle'] and os.path.exists(data['translated_subtitle']):
-            return send_file(
-                data['translated_subtitle'],
-                mimetype='text/plain',
-                as_attachment=True,
-                download_name='translated_subtitles.srt'
-            )
+        language = request.args.get('language')
+        translation = get_translation(data, language)
+        if translation and translation['cues']:
+            return send_cues(CueList.from_dict(translation['cues']),
+                             f'translated_subtitles_{language}.srt' if language else 'translated_subtitles.srt')
         return jsonify({'success': False, 'error': 'No subtitles available'}), 404
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -320,10 +1079,36 @@ def reset_session():
     cleanup_session()
     return jsonify({'success': True, 'message': 'Session reset successfully'})
 
+@app.route('/metrics')
+def metrics():
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/health')
+@app.route('/health/live')
 def health_check():
+    # Liveness: the process answers requests; nothing is loaded or probed
     return jsonify({'status': 'healthy'})
 
+@app.route('/health/ready')
+def readiness_check():
+    from utils.video_processor import ffmpeg_status, ffprobe_status
+    # Each worker starts loading its Whisper models when it boots
+    # (gunicorn.conf.py); readiness only reports on them
+    status = warmup_status()
+    status['ffmpeg'] = ffmpeg_status()
+    status['ffprobe'] = ffprobe_status()
+    status['ready'] = status['ready'] and status['ffmpeg']['available'] and status['ffprobe']['available']
+    if status['ready']:
+        status['status'] = 'ready'
+    elif not status['ffmpeg']['available']:
+        status['status'] = 'ffmpeg_unavailable'
+    elif not status['ffprobe']['available']:
+        status['status'] = 'ffprobe_unavailable'
+    else:
+        status['status'] = 'warming_up'
+    return jsonify(status), 200 if status['ready'] else 503
+
 if __name__ == '__main__':
+    start_warmup()
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
@@ -0,0 +1,264 @@
+"""
+Dub many videos into many languages from the command line
+
+Usage:
+    python batch_dub.py videos/ --languages es fr de --output dubbed/
+
+Each input video is transcribed once; translation, speech synthesis and
+muxing for the target languages then run in parallel while the next video
+is transcribed. Results are written to OUTPUT/<video>/ and summarised in
+OUTPUT/manifest.json. Running the same command again resumes the batch:
+outputs that already exist are skipped, and files are only moved into
+place once they are complete.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.audio_generator import generate_dubbed_audio, manifest_path
+from utils.chunked_transcriber import TRANSCRIBE_PROCESSES, transcribe_audio_parallel, transcribe_media_stream
+from utils.subtitle_generator import generate_subtitle_file
+from utils.translator import translate_subtitles
+from utils.video_processor import decode_audio, replace_audio_track
+
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.mkv', '.webm', '.avi', '.m4v')
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def find_videos(inputs):
+    """Expand files and directories into a sorted list of video paths"""
+    videos = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                videos.extend(os.path.join(root, name) for name in files
+                              if name.lower().endswith(VIDEO_EXTENSIONS))
+        else:
+            videos.append(path)
+    return sorted(dict.fromkeys(os.path.abspath(path) for path in videos))
+
+
+def video_names(videos):
+    """Output directory name per video; stems shared by several inputs get a path hash"""
+    stems = [os.path.splitext(os.path.basename(path))[0] for path in videos]
+    names = {}
+    for path, stem in zip(videos, stems):
+        if stems.count(stem) > 1:
+            stem = f"{stem}-{hashlib.sha1(path.encode('utf-8')).hexdigest()[:8]}"
+        names[path] = stem
+    return names
+
+
+def partial_path(path):
+    """Temporary name a file is written under until it is complete"""
+    base, ext = os.path.splitext(path)
+    return f"{base}.partial{ext}"
+
+
+class BatchManifest:
+    """
+    JSON record of the batch, rewritten atomically after every change
+
+    Args:
+        path: Location of manifest.json
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+        except (OSError, ValueError):
+            self.data = {'videos': {}}
+
+    def video(self, name):
+        with self._lock:
+            return dict(self.data['videos'].get(name, {}))
+
+    def update_video(self, name, **fields):
+        with self._lock:
+            self.data['videos'].setdefault(name, {'outputs': {}}).update(fields)
+            self._save()
+
+    def update_output(self, name, language, **fields):
+        with self._lock:
+            video = self.data['videos'].setdefault(name, {'outputs': {}})
+            video.setdefault('outputs', {}).setdefault(language, {}).update(fields)
+            self._save()
+
+    def _save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def log(message):
+    print(f"[{time.strftime('%H:%M:%S')}] {message}", file=sys.stderr, flush=True)
+
+
+def transcribe_video(video_path, subtitle_path, model_size=None):
+    """
+    Write the source-language subtitles of a video
+
+    Returns:
+        str: Detected language code
+    """
+    if TRANSCRIBE_PROCESSES > 1:
+        language, segments = transcribe_audio_parallel(None, samples=decode_audio(video_path))
+    else:
+        language, segments = transcribe_media_stream(video_path, model_size)
+    tmp_path = partial_path(subtitle_path)
+    generate_subtitle_file(segments, tmp_path)
+    os.replace(tmp_path, subtitle_path)
+    return language
+
+
+def dub_language(video_path, source_subtitles, source_language, language, directory, name):
+    """
+    Translate, synthesize and mux one target language, skipping finished steps
+
+    Returns:
+        dict: Relative paths of the outputs
+    """
+    subtitles = os.path.join(directory, f"subtitles_{language}.srt")
+    audio = os.path.join(directory, f"dubbed_{language}.wav")
+    video = os.path.join(directory, f"{name}_{language}.mp4")
+
+    if not os.path.exists(subtitles):
+        tmp_path = partial_path(subtitles)
+        translate_subtitles(source_subtitles, tmp_path, language, source_language)
+        os.replace(tmp_path, subtitles)
+
+    if not os.path.exists(audio):
+        tmp_path = partial_path(audio)
+        generate_dubbed_audio(subtitles, tmp_path, language, incremental=False)
+        # Keep the cue manifest so a later re-dub of this file can be incremental
+        os.replace(manifest_path(tmp_path), manifest_path(audio))
+        os.replace(tmp_path, audio)
+
+    if not os.path.exists(video):
+        tmp_path = partial_path(video)
+        replace_audio_track(video_path, audio, tmp_path)
+        os.replace(tmp_path, video)
+
+    return {
+        'subtitles': os.path.relpath(subtitles, os.path.dirname(directory)),
+        'audio': os.path.relpath(audio, os.path.dirname(directory)),
+        'video': os.path.relpath(video, os.path.dirname(directory)),
+    }
+
+
+def run_batch(videos, languages, output_dir, source_language='auto', jobs=2, model_size=None):
+    """
+    Dub every video into every language
+
+    Args:
+        videos: List of input video paths
+        languages: List of target language codes
+        output_dir: Directory receiving one subdirectory per video and the manifest
+        source_language: Language of the videos, or 'auto' to use the detected one
+        jobs: Number of (video, language) outputs produced concurrently
+        model_size: Whisper model size (defaults to WHISPER_MODEL)
+
+    Returns:
+        int: Number of failed outputs
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = BatchManifest(os.path.join(output_dir, MANIFEST_NAME))
+    names = video_names(videos)
+    failures = [0]
+    failures_lock = threading.Lock()
+
+    def run_output(video_path, name, source_subtitles, detected, language):
+        started = time.time()
+        manifest.update_output(name, language, status='running', error=None)
+        try:
+            paths = dub_language(video_path, source_subtitles, detected, language,
+                                 os.path.join(output_dir, name), name)
+            manifest.update_output(name, language, status='completed', seconds=round(time.time() - started, 2),
+                                   **paths)
+            log(f"{name} [{language}] done in {time.time() - started:.1f}s")
+        except Exception as e:
+            manifest.update_output(name, language, status='failed', error=str(e))
+            with failures_lock:
+                failures[0] += 1
+            log(f"{name} [{language}] failed: {e}")
+
+    # Transcription runs on this thread, so the next video is transcribed
+    # while the previous one is being translated and dubbed
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        for video_path in videos:
+            name = names[video_path]
+            directory = os.path.join(output_dir, name)
+            os.makedirs(directory, exist_ok=True)
+            source_subtitles = os.path.join(directory, "source.srt")
+
+            pending = [language for language in languages
+                       if not os.path.exists(os.path.join(directory, f"{name}_{language}.mp4"))]
+            for language in languages:
+                if language not in pending:
+                    manifest.update_output(name, language, status='completed')
+            if not pending:
+                log(f"{name}: all languages already done")
+                continue
+
+            detected = manifest.video(name).get('source_language')
+            if not os.path.exists(source_subtitles) or not detected:
+                log(f"{name}: transcribing")
+                started = time.time()
+                try:
+                    detected = transcribe_video(video_path, source_subtitles, model_size)
+                except Exception as e:
+                    manifest.update_video(name, input=video_path, status='failed', error=str(e))
+                    with failures_lock:
+                        failures[0] += len(pending)
+                    log(f"{name}: transcription failed: {e}")
+                    continue
+                log(f"{name}: transcribed ({detected}) in {time.time() - started:.1f}s")
+            manifest.update_video(name, input=video_path, status='transcribed', error=None,
+                                  source_language=detected,
+                                  subtitles=os.path.relpath(source_subtitles, output_dir))
+
+            translate_from = detected if source_language == 'auto' else source_language
+            for language in pending:
+                executor.submit(run_output, video_path, name, source_subtitles, translate_from, language)
+
+    return failures[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('inputs', nargs='+', help='Video files or directories containing videos')
+    parser.add_argument('--languages', '-l', nargs='+', required=True, help='Target language codes, e.g. es fr hi')
+    parser.add_argument('--output', '-o', required=True, help='Output directory')
+    parser.add_argument('--source-language', default='auto',
+                        help="Language code of the videos (default: detected by Whisper)")
+    parser.add_argument('--jobs', '-j', type=int, default=2,
+                        help='Outputs (video x language) produced concurrently')
+    parser.add_argument('--model', default=None, help='Whisper model size (default: WHISPER_MODEL)')
+    args = parser.parse_args()
+
+    videos = find_videos(args.inputs)
+    if not videos:
+        parser.error('no input videos found')
+
+    log(f"{len(videos)} video(s) x {len(args.languages)} language(s) -> {args.output}")
+    failed = run_batch(videos, args.languages, args.output, args.source_language, args.jobs, args.model)
+    if failed:
+        log(f"{failed} output(s) failed; see {os.path.join(args.output, MANIFEST_NAME)}")
+        sys.exit(1)
+    log("All outputs completed")
+
+
+if __name__ == '__main__':
+    main()
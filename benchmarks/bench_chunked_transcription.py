@@ -0,0 +1,93 @@
+"""
+Compare single-pass and parallel chunked transcription wall-clock time
+
+Usage:
+    python benchmarks/bench_chunked_transcription.py --minutes 10 --processes 4
+
+Without --input a synthetic 16 kHz mono WAV is generated: bursts of voiced
+noise separated by short silences, which gives the splitter realistic pauses
+to cut at. Results are printed as JSON.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import wave
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.chunked_transcriber import SAMPLE_RATE, get_transcription_pool, transcribe_audio_parallel
+from utils.transcriber import load_whisper_model, TRANSCRIBE_OPTIONS
+
+
+def write_synthetic_audio(path, minutes, seed=0):
+    """Write bursts of modulated noise with 0.5-1.5 s pauses between them"""
+    rng = np.random.default_rng(seed)
+    total = int(minutes * 60 * SAMPLE_RATE)
+    with wave.open(path, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(SAMPLE_RATE)
+        written = 0
+        while written < total:
+            burst = int(rng.uniform(2, 6) * SAMPLE_RATE)
+            t = np.arange(burst) / SAMPLE_RATE
+            envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t)
+            voiced = np.sin(2 * np.pi * rng.uniform(120, 250) * t) + 0.3 * rng.standard_normal(burst)
+            pause = np.zeros(int(rng.uniform(0.5, 1.5) * SAMPLE_RATE))
+            chunk = np.concatenate([voiced * envelope * 6000, pause])[:total - written]
+            wav_file.writeframes(chunk.astype(np.int16).tobytes())
+            written += len(chunk)
+
+
+def run_single_pass(audio_path, cpu_threads):
+    model = load_whisper_model(cpu_threads=cpu_threads)
+    start = time.perf_counter()
+    segments, _ = model.transcribe(audio_path, **TRANSCRIBE_OPTIONS)
+    count = sum(1 for _ in segments)
+    return time.perf_counter() - start, count
+
+
+def run_parallel(audio_path, processes, chunk_seconds):
+    pool = get_transcription_pool(processes=processes)
+    # Load the models in every worker before timing
+    list(pool.map(abs, range(processes)))
+    start = time.perf_counter()
+    _, segments = transcribe_audio_parallel(audio_path, chunk_seconds=chunk_seconds, pool=pool)
+    count = sum(1 for _ in segments)
+    return time.perf_counter() - start, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--input', help='16 kHz mono WAV to transcribe instead of synthetic audio')
+    parser.add_argument('--minutes', type=float, default=10, help='Length of the synthetic audio')
+    parser.add_argument('--processes', type=int, default=max(2, (os.cpu_count() or 2) // 2))
+    parser.add_argument('--chunk-seconds', type=float, default=120)
+    args = parser.parse_args()
+
+    audio_path = args.input
+    if audio_path is None:
+        audio_path = os.path.join(tempfile.mkdtemp(), 'synthetic.wav')
+        write_synthetic_audio(audio_path, args.minutes)
+
+    single_seconds, single_segments = run_single_pass(audio_path, cpu_threads=os.cpu_count() or 1)
+    parallel_seconds, parallel_segments = run_parallel(audio_path, args.processes, args.chunk_seconds)
+
+    print(json.dumps({
+        'audio': audio_path,
+        'processes': args.processes,
+        'chunk_seconds': args.chunk_seconds,
+        'single_pass_seconds': round(single_seconds, 2),
+        'single_pass_segments': single_segments,
+        'parallel_seconds': round(parallel_seconds, 2),
+        'parallel_segments': parallel_segments,
+        'speedup': round(single_seconds / parallel_seconds, 2) if parallel_seconds else None,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""
+Compare the subtitle handling of the pipeline before and after the cue store
+
+Usage:
+    python benchmarks/bench_cues.py --cues 5000 --repeat 5
+
+Both flows take the same synthetic transcription through what the app does
+with subtitles between transcription and dubbing: build the cue list, keep
+it in the session (serialised as JSON), serve it to the client, apply an
+edit to every cue and hand the result to the audio generator.
+
+The 'srt' flow is how subtitles were handled before: one dict with SRT
+timestamp strings per cue, SRT files written during stage 1, and pysrt
+parsing and rewriting those files for edits and again for dubbing. The
+'cue_store' flow keeps utils.cues.CueList (integer milliseconds and text)
+throughout and renders SRT once, as an export.
+
+Per flow the report has wall time (best of --repeat), peak memory allocated
+by Python during the flow (tracemalloc), the size of the session JSON and
+bytes written to disk. Results are printed as JSON.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pysrt
+
+from utils.cues import CueList, format_timestamp, seconds_to_ms
+
+Segment = namedtuple('Segment', ['start', 'end', 'text'])
+
+PHRASES = [
+    "The quick brown fox jumps over the lazy dog.",
+    "Please remember to save your work before leaving.",
+    "This sentence is a little longer than the one before it, on purpose.",
+    "Short line.",
+]
+
+
+def synthetic_segments(count):
+    return [Segment(i * 2.5, i * 2.5 + 2.0, f"{i + 1}. {PHRASES[i % len(PHRASES)]}") for i in range(count)]
+
+
+def srt_flow(segments, work_dir):
+    """Dicts with SRT timestamps, SRT files and pysrt round trips"""
+    original_path = os.path.join(work_dir, 'subtitles_en.srt')
+    translated_path = os.path.join(work_dir, 'subtitles_es.srt')
+    original, translated = [], []
+    with open(original_path, 'w', encoding='utf-8') as original_file, \
+            open(translated_path, 'w', encoding='utf-8') as translated_file:
+        for index, segment in enumerate(segments, 1):
+            for cues, f in ((original, original_file), (translated, translated_file)):
+                cue = {'index': index, 'start': format_timestamp(seconds_to_ms(segment.start)),
+                       'end': format_timestamp(seconds_to_ms(segment.end)), 'text': segment.text.strip()}
+                f.write(f"{cue['index']}\n{cue['start']} --> {cue['end']}\n{cue['text']}\n\n")
+                f.flush()
+                cues.append(cue)
+    session = json.dumps({'original_subtitles_data': original, 'subtitles_data': translated})
+    client = json.dumps(json.loads(session)['subtitles_data'])
+
+    data = json.loads(session)
+    for cue in data['subtitles_data']:
+        cue['text'] = cue['text'].upper()
+    subs = pysrt.SubRipFile()
+    for cue in data['subtitles_data']:
+        subs.append(pysrt.SubRipItem(index=cue['index'], start=cue['start'], end=cue['end'], text=cue['text']))
+    subs.save(translated_path, encoding='utf-8')
+    session = json.dumps(data)
+
+    subs = pysrt.open(translated_path, encoding='utf-8')
+    dub_cues = [[sub.start.ordinal, sub.end.ordinal, sub.text.strip()] for sub in subs if sub.text.strip()]
+    return len(session), len(client), len(dub_cues)
+
+
+def cue_store_flow(segments, work_dir):
+    """CueList in the session, SRT rendered once as an export"""
+    original, translated = CueList(), CueList()
+    for segment in segments:
+        position = original.append(seconds_to_ms(segment.start), seconds_to_ms(segment.end), segment.text)
+        translated.append(original.starts[position], original.ends[position], original.texts[position])
+    session = json.dumps({'original_cues': original.to_dict(), 'cues': translated.to_dict()})
+    client = json.dumps(CueList.from_dict(json.loads(session)['cues']).to_client())
+
+    data = json.loads(session)
+    cues = CueList.from_dict(data['cues'])
+    for index in range(len(cues)):
+        cues.set_text(index, cues.texts[index].upper())
+    data['cues'] = cues.to_dict()
+    session = json.dumps(data)
+
+    cues = CueList.from_dict(json.loads(session)['cues'])
+    dub_cues = [[start, end, text] for start, end, text in cues if text]
+    cues.write(os.path.join(work_dir, 'subtitles_es.srt'))
+    return len(session), len(client), len(dub_cues)
+
+
+def _dir_bytes(directory):
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+def measure(flow, segments, repeat):
+    best = None
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory(prefix='bench_cues_') as work_dir:
+            start = time.perf_counter()
+            flow(segments, work_dir)
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    with tempfile.TemporaryDirectory(prefix='bench_cues_') as work_dir:
+        tracemalloc.start()
+        session_bytes, client_bytes, dub_cues = flow(segments, work_dir)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        disk_bytes = _dir_bytes(work_dir)
+    return {
+        'wall_seconds': round(best, 4),
+        'peak_alloc_mb': round(peak / (1024 * 1024), 2),
+        'session_json_bytes': session_bytes,
+        'client_json_bytes': client_bytes,
+        'disk_bytes': disk_bytes,
+        'dub_cues': dub_cues,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cues', type=int, default=5000, help='Number of subtitle cues')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per flow; the best is reported')
+    parser.add_argument('--output', help='Also write the JSON results to this file')
+    args = parser.parse_args()
+
+    segments = synthetic_segments(args.cues)
+    flows = {'srt': measure(srt_flow, segments, args.repeat),
+             'cue_store': measure(cue_store_flow, segments, args.repeat)}
+    results = {
+        'cues': args.cues,
+        'flows': flows,
+        'speedup': round(flows['srt']['wall_seconds'] / flows['cue_store']['wall_seconds'], 2)
+        if flows['cue_store']['wall_seconds'] > 0 else None,
+    }
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Check that importing the app stays within a time budget
+
+Usage:
+    python benchmarks/bench_import.py --repeat 5 --budget-ms 750
+
+Every run imports app in a fresh interpreter (as a gunicorn worker boot
+does) and records how long `import app` took and which of the heavy
+dependencies were loaded by it. Those (numpy, ffmpeg-python, faster-whisper,
+moviepy, pysrt and the TTS and translation clients) are meant to be imported
+on first use, so any of them showing up is a regression even while the time
+is within budget. One more run with -X importtime lists the slowest imports.
+
+The report is printed as JSON. The exit status is 1 when the median import
+time exceeds --budget-ms or a heavy module was loaded, so the script can
+gate CI.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must not be loaded by `import app`
+HEAVY_MODULES = ['numpy', 'ffmpeg', 'faster_whisper', 'ctranslate2', 'gtts', 'pydub', 'moviepy', 'translate', 'pysrt']
+
+_CHILD = f"""
+import json, sys, time
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'heavy': [name for name in {HEAVY_MODULES!r} if name in sys.modules]}}))
+"""
+
+
+def _child_env(work_dir):
+    # Keep the import's side effects (session database, metrics) out of the tree
+    env = dict(os.environ)
+    env.setdefault('SESSION_DB_PATH', os.path.join(work_dir, 'sessions.sqlite3'))
+    env.setdefault('METRICS_DIR', 'off')
+    return env
+
+
+def measure_import(env):
+    output = subprocess.run([sys.executable, '-c', _CHILD], cwd=ROOT, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(env, count):
+    """Modules with the largest cumulative import time, from -X importtime"""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=ROOT, env=env,
+                            check=True, capture_output=True, text=True).stderr
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.append({'module': name.strip(), 'cumulative_ms': round(int(cumulative) / 1000, 1)})
+    modules.sort(key=lambda module: module['cumulative_ms'], reverse=True)
+    return modules[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='Fresh interpreters to time')
+    parser.add_argument('--budget-ms', type=float, default=750, help='Allowed median time of import app')
+    parser.add_argument('--top', type=int, default=15, help='Number of slowest imports to list')
+    parser.add_argument('--output', help='Also write the JSON results to this file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='bench_import_') as work_dir:
+        env = _child_env(work_dir)
+        runs = [measure_import(env) for _ in range(args.repeat)]
+        top = slowest_imports(env, args.top)
+
+    times_ms = [run['seconds'] * 1000 for run in runs]
+    heavy = sorted({name for run in runs for name in run['heavy']})
+    median_ms = statistics.median(times_ms)
+    results = {
+        'python': sys.version.split()[0],
+        'runs_ms': [round(ms, 1) for ms in times_ms],
+        'median_ms': round(median_ms, 1),
+        'budget_ms': args.budget_ms,
+        'heavy_modules_loaded': heavy,
+        'slowest_imports': top,
+        'ok': median_ms <= args.budget_ms and not heavy,
+    }
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    print(output)
+    sys.exit(0 if results['ok'] else 1)
+
+
+if __name__ == '__main__':
+    main()
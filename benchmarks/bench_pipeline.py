@@ -0,0 +1,239 @@
+"""
+Measure every stage of the dubbing pipeline on synthetic videos
+
+Usage:
+    python benchmarks/bench_pipeline.py --minutes 1 10 60 --output results.json
+    python benchmarks/bench_pipeline.py --minutes 1 10 --compare results.json
+
+For each length a test video is generated with ffmpeg (testsrc picture,
+tone bursts separated by pauses as audio) and run through extract_audio,
+transcribe_audio, generate_subtitle_file, translate_subtitles,
+generate_dubbed_audio and replace_audio_track. Translation and speech use
+the deterministic offline 'echo' and 'tone' engines and the translation and
+clip caches are disabled, so runs are comparable. Transcription uses the
+real Whisper model (loaded before timing; --transcriber none skips it); the
+later stages work from a fixed synthetic cue list, so their numbers do not
+depend on what Whisper makes of the tones.
+
+Per stage the report has wall time, CPU time of this process and of ffmpeg
+children, peak RSS of this process during the stage (Linux; elsewhere the
+peak so far), the largest child RSS so far, and bytes written to the work
+directory. Results are printed as JSON; --compare prints the wall-time
+ratio of every stage against an earlier result file.
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from collections import namedtuple
+
+# Stand-in engines and no caches, set before the pipeline modules read them
+os.environ['TRANSLATION_ENGINE'] = 'echo'
+os.environ['TTS_ENGINE'] = 'tone'
+os.environ['TRANSLATION_CACHE_PATH'] = 'off'
+os.environ['TTS_CACHE_MAX_MB'] = '0'
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ffmpeg
+
+from utils.audio_generator import generate_dubbed_audio
+from utils.subtitle_generator import generate_subtitle_file
+from utils.transcriber import WHISPER_MODEL, get_whisper_model, transcribe_audio
+from utils.translator import translate_subtitles
+from utils.video_processor import extract_audio, replace_audio_track
+
+# Synthetic speech pattern: a burst of tone every CUE_PERIOD seconds
+CUE_PERIOD = 5.0
+CUE_LENGTH = 3.5
+
+PHRASES = [
+    "The quick brown fox jumps over the lazy dog.",
+    "Please remember to save your work before leaving.",
+    "This sentence is a little longer than the one before it, on purpose.",
+    "Short line.",
+    "Benchmarks should be boring and repeatable.",
+]
+
+Segment = namedtuple('Segment', ['start', 'end', 'text'])
+
+
+def make_video(path, minutes):
+    """Write a test video with 320x240 testsrc picture and tone-burst audio"""
+    seconds = minutes * 60
+    video = ffmpeg.input(f'testsrc=size=320x240:rate=10:duration={seconds}', f='lavfi')
+    # Commas inside the expression are escaped for the filtergraph parser
+    expression = (f"sin(2*PI*220*t)*(0.5+0.5*sin(2*PI*4*t))"
+                  f"*lt(mod(t\\,{CUE_PERIOD})\\,{CUE_LENGTH})*0.3")
+    audio = ffmpeg.input(f"aevalsrc={expression}:s=44100:d={seconds}", f='lavfi')
+    stream = ffmpeg.output(video, audio, path, vcodec='libx264', preset='ultrafast', acodec='aac')
+    ffmpeg.run(stream, overwrite_output=True, quiet=True)
+
+
+def synthetic_segments(minutes):
+    """Cue list matching the tone bursts of make_video"""
+    count = int(minutes * 60 // CUE_PERIOD)
+    return [Segment(i * CUE_PERIOD, i * CUE_PERIOD + CUE_LENGTH, f"{i + 1}. {PHRASES[i % len(PHRASES)]}")
+            for i in range(count)]
+
+
+def _reset_peak_rss():
+    # Writing 5 to clear_refs resets VmHWM on Linux
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return maxrss / (1024 * 1024) if sys.platform == 'darwin' else maxrss / 1024
+
+
+def _file_sizes(directory):
+    sizes = {}
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                sizes[path] = os.path.getsize(path)
+            except OSError:
+                pass
+    return sizes
+
+
+def measure(func, work_dir):
+    """
+    Run func() and collect its resource usage
+
+    Returns:
+        tuple: (result of func, dict of measurements)
+    """
+    before_files = _file_sizes(work_dir)
+    _reset_peak_rss()
+    self_before = resource.getrusage(resource.RUSAGE_SELF)
+    children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    wall_start = time.perf_counter()
+
+    result = func()
+
+    wall = time.perf_counter() - wall_start
+    self_after = resource.getrusage(resource.RUSAGE_SELF)
+    children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    after_files = _file_sizes(work_dir)
+    child_maxrss = children_after.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    return result, {
+        'wall_seconds': round(wall, 3),
+        'cpu_seconds': round(self_after.ru_utime + self_after.ru_stime
+                             - self_before.ru_utime - self_before.ru_stime, 3),
+        'child_cpu_seconds': round(children_after.ru_utime + children_after.ru_stime
+                                   - children_before.ru_utime - children_before.ru_stime, 3),
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+        'child_peak_rss_mb': round(child_maxrss, 1),
+        'bytes_written': sum(max(0, size - before_files.get(path, 0)) for path, size in after_files.items()),
+    }
+
+
+def run_pipeline(minutes, work_dir, transcriber, model_size, language):
+    """Generate (or reuse) the video for one length and measure every stage"""
+    video_path = os.path.join(work_dir, f'synthetic_{minutes:g}m.mp4')
+    if not os.path.exists(video_path):
+        make_video(video_path, minutes)
+
+    run_dir = tempfile.mkdtemp(prefix=f'run_{minutes:g}m_', dir=work_dir)
+    audio_path = os.path.join(run_dir, 'extracted_audio.wav')
+    source_srt = os.path.join(run_dir, 'source.srt')
+    translated_srt = os.path.join(run_dir, f'subtitles_{language}.srt')
+    dubbed_audio = os.path.join(run_dir, 'dubbed_audio.wav')
+    output_video = os.path.join(run_dir, 'output.mp4')
+    segments = synthetic_segments(minutes)
+
+    stages = {}
+    _, stages['extract_audio'] = measure(lambda: extract_audio(video_path, audio_path), run_dir)
+    if transcriber == 'whisper':
+        get_whisper_model(model_size)
+        (_, transcribed), stages['transcribe_audio'] = measure(
+            lambda: transcribe_audio(audio_path, model_size), run_dir)
+        stages['transcribe_audio']['segments'] = len(transcribed)
+    _, stages['generate_subtitle_file'] = measure(lambda: generate_subtitle_file(segments, source_srt), run_dir)
+    _, stages['translate_subtitles'] = measure(
+        lambda: translate_subtitles(source_srt, translated_srt, language, 'en'), run_dir)
+    _, stages['generate_dubbed_audio'] = measure(
+        lambda: generate_dubbed_audio(translated_srt, dubbed_audio, language, incremental=False), run_dir)
+    _, stages['replace_audio_track'] = measure(
+        lambda: replace_audio_track(video_path, dubbed_audio, output_video), run_dir)
+
+    return {
+        'minutes': minutes,
+        'cues': len(segments),
+        'video_bytes': os.path.getsize(video_path),
+        'stages': stages,
+    }
+
+
+def compare(results, baseline):
+    """Wall-time ratio (current / baseline) for every stage found in both runs"""
+    previous = {run['minutes']: run['stages'] for run in baseline.get('runs', [])}
+    ratios = {}
+    for run in results['runs']:
+        old = previous.get(run['minutes'])
+        if old is None:
+            continue
+        ratios[f"{run['minutes']:g}m"] = {
+            stage: round(stats['wall_seconds'] / old[stage]['wall_seconds'], 2)
+            for stage, stats in run['stages'].items()
+            if stage in old and old[stage]['wall_seconds'] > 0
+        }
+    return ratios
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--minutes', type=float, nargs='+', default=[1, 10],
+                        help='Lengths of the synthetic videos (e.g. 1 10 60)')
+    parser.add_argument('--work-dir', help='Directory for videos and outputs; videos are reused across runs')
+    parser.add_argument('--transcriber', choices=['whisper', 'none'], default='whisper')
+    parser.add_argument('--model', default=WHISPER_MODEL, help='Whisper model size')
+    parser.add_argument('--language', default='es', help='Target language code')
+    parser.add_argument('--output', help='Also write the JSON results to this file')
+    parser.add_argument('--compare', help='Earlier result file to compare wall times against')
+    args = parser.parse_args()
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='bench_pipeline_')
+    os.makedirs(work_dir, exist_ok=True)
+
+    results = {
+        'work_dir': work_dir,
+        'transcriber': args.transcriber,
+        'model': args.model if args.transcriber == 'whisper' else None,
+        'language': args.language,
+        'cpu_count': os.cpu_count(),
+        'runs': [run_pipeline(minutes, work_dir, args.transcriber, args.model, args.language)
+                 for minutes in args.minutes],
+    }
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            results['wall_ratio_vs_baseline'] = compare(results, json.load(f))
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Compare per-cue cost of WSOLA time-stretching with pydub's speedup
+
+Usage:
+    python benchmarks/bench_time_stretch.py --cues 200 --rates 1.1 1.5 2.0
+
+Synthetic cues of 1-6 s voiced noise at 24 kHz are fitted at every rate
+with both implementations. Results are printed as JSON with per-cue
+milliseconds and the output length error relative to the requested rate.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.audio_timeline import DEFAULT_SAMPLE_RATE, array_to_segment, segment_to_array
+from utils.audio_generator import fit_clip
+from utils.time_stretch import wsola
+
+
+def make_cues(count, sample_rate, seed=0):
+    """Voiced noise bursts with a syllable-rate envelope, like the TTS clips"""
+    rng = np.random.default_rng(seed)
+    cues = []
+    for _ in range(count):
+        length = int(rng.uniform(1, 6) * sample_rate)
+        t = np.arange(length) / sample_rate
+        envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t)
+        voiced = np.sin(2 * np.pi * rng.uniform(120, 250) * t) + 0.3 * rng.standard_normal(length)
+        cues.append((voiced * envelope * 6000).astype(np.int16))
+    return cues
+
+
+def pydub_speedup(clip, rate, sample_rate):
+    # The implementation fit_clip used before WSOLA
+    audio = array_to_segment(clip, sample_rate)
+    audio = audio.speedup(playback_speed=rate)
+    return segment_to_array(audio, sample_rate)
+
+
+def measure(func, cues, rate, sample_rate):
+    start = time.perf_counter()
+    outputs = [func(clip, rate, sample_rate) for clip in cues]
+    elapsed = time.perf_counter() - start
+    errors = [abs(len(out) - len(clip) / rate) / (len(clip) / rate) for clip, out in zip(cues, outputs)]
+    return {
+        'ms_per_cue': elapsed * 1000 / len(cues),
+        'max_length_error': max(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cues', type=int, default=200)
+    parser.add_argument('--rates', type=float, nargs='+', default=[1.1, 1.25, 1.5, 2.0])
+    parser.add_argument('--sample-rate', type=int, default=DEFAULT_SAMPLE_RATE)
+    args = parser.parse_args()
+
+    cues = make_cues(args.cues, args.sample_rate)
+    results = {'cues': args.cues, 'sample_rate': args.sample_rate, 'rates': {}}
+    for rate in args.rates:
+        results['rates'][str(rate)] = {
+            'pydub_speedup': measure(pydub_speedup, cues, rate, args.sample_rate),
+            'wsola': measure(wsola, cues, rate, args.sample_rate),
+        }
+
+    # Path used when rendering a dub, clip by clip: slots 1.5x shorter than the clips
+    slots_ms = [len(clip) * 1000 / args.sample_rate / 1.5 for clip in cues]
+    start = time.perf_counter()
+    for clip, slot_ms in zip(cues, slots_ms):
+        fit_clip(clip, slot_ms, args.sample_rate, max_rate=2.0)
+    results['fit_clip_ms_per_cue'] = (time.perf_counter() - start) * 1000 / len(cues)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
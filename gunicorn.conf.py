@@ -0,0 +1,13 @@
+"""
+Gunicorn settings, read from the working directory by `gunicorn app:app`
+
+Command-line options (bind, workers, threads) are set where gunicorn is
+started, e.g. the Dockerfile.
+"""
+
+
+def post_worker_init(worker):
+    # Each worker holds its own Whisper models; loading them as the worker
+    # boots keeps the load out of its first stage 1 job
+    from utils.transcriber import start_warmup
+    start_warmup()
@@ -0,0 +1,82 @@
+import json
+import os
+import wave
+
+import numpy as np
+import pytest
+
+from utils.audio_generator import _render_full, generate_dubbed_audio, manifest_path
+from utils.clip_cache import ClipCache
+from utils.cues import CueList
+from utils.tts_engines import ToneTTSEngine
+
+
+class CountingToneEngine(ToneTTSEngine):
+    """Tone engine that records which texts it was asked to synthesize"""
+
+    def __init__(self, **kwargs):
+        super().__init__(sample_rate=8000, **kwargs)
+        self.calls = []
+
+    def synthesize(self, text, language):
+        self.calls.append(text)
+        return super().synthesize(text, language)
+
+
+def _cues(texts):
+    cues = CueList()
+    for i, text in enumerate(texts):
+        cues.append(i * 2000, i * 2000 + 1500, text)
+    return cues
+
+
+def _samples(path):
+    with wave.open(path, 'rb') as wav_file:
+        return np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype=np.int16)
+
+
+TEXTS = ['one', 'two', 'three', 'four', 'five']
+EDITED = ['one', 'two', 'THREE again', 'four', 'five']
+
+
+@pytest.fixture
+def render(tmp_path):
+    engine = CountingToneEngine()
+    cache = ClipCache(str(tmp_path / 'clips'), 16 * 1024 * 1024)
+    output = str(tmp_path / 'dub.wav')
+    result = generate_dubbed_audio(_cues(TEXTS), output, 'en', engine=engine, cache=cache)
+    assert result == {'incremental': False, 'cues_rendered': len(TEXTS)}
+    engine.calls.clear()
+    return engine, cache, output
+
+
+def test_patch_matches_full_render_and_only_synthesizes_the_edit(render, tmp_path):
+    engine, cache, output = render
+
+    result = generate_dubbed_audio(_cues(EDITED), output, 'en', engine=engine, cache=cache)
+    assert result == {'incremental': True, 'cues_rendered': 1}
+    assert engine.calls == ['THREE again']
+
+    edited = _cues(EDITED)
+    full_path = str(tmp_path / 'full.wav')
+    _render_full(full_path, [[start, end, text] for start, end, text in edited], edited.duration, 'en',
+                 CountingToneEngine(), None, 1, None)
+    assert np.array_equal(_samples(output), _samples(full_path))
+
+
+@pytest.mark.parametrize('damage', ['missing', 'stale'])
+def test_falls_back_to_full_render_without_a_valid_manifest(render, damage):
+    engine, cache, output = render
+    if damage == 'missing':
+        os.remove(manifest_path(output))
+    else:
+        # The WAV no longer has the length the manifest describes
+        with open(manifest_path(output), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        manifest['total_samples'] += 1
+        with open(manifest_path(output), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+
+    result = generate_dubbed_audio(_cues(EDITED), output, 'en', engine=engine, cache=cache)
+    assert result == {'incremental': False, 'cues_rendered': len(EDITED)}
+    assert os.path.exists(manifest_path(output))
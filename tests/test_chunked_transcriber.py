@@ -0,0 +1,27 @@
+from utils.chunked_transcriber import TranscribedSegment as S, stitch_segments
+
+
+def _texts(chunks):
+    return [segment.text for segment in stitch_segments(chunks)]
+
+
+def test_drops_text_repeated_across_a_chunk_boundary():
+    chunks = [[S(0, 1, 'Hello.'), S(1.5, 2.9, 'How are you?')],
+              [S(3.2, 4, 'How are you?'), S(4.5, 5, 'Fine.')]]
+    assert _texts(chunks) == ['Hello.', 'How are you?', 'Fine.']
+
+
+def test_keeps_a_line_repeated_within_a_chunk():
+    chunks = [[S(0, 1, 'No.'), S(1.2, 2, 'No.'), S(2.5, 3, 'Stop')]]
+    assert _texts(chunks) == ['No.', 'No.', 'Stop']
+
+
+def test_keeps_a_repeat_inside_the_chunk_after_a_boundary():
+    chunks = [[S(0, 1, 'Go.')],
+              [S(1.1, 1.5, 'Go.'), S(2, 3, 'Wait.'), S(3.2, 4, 'Wait.')]]
+    assert _texts(chunks) == ['Go.', 'Wait.', 'Wait.']
+
+
+def test_keeps_boundary_repeats_after_a_long_gap():
+    chunks = [[S(0, 1, 'Again.')], [S(5, 6, 'Again.')]]
+    assert _texts(chunks) == ['Again.', 'Again.']
@@ -0,0 +1,70 @@
+import hashlib
+import os
+
+os.environ.setdefault('SESSION_STORE', 'memory')
+os.environ.setdefault('METRICS_DIR', 'off')
+
+import app as app_module
+from utils.chunked_upload import finalize_upload
+
+CONTENT = bytes(range(256)) * 40
+FIRST, SECOND = CONTENT[:4096], CONTENT[4096:]
+
+
+def _start_upload(client):
+    response = client.post('/api/upload/init', json={'size': len(CONTENT)})
+    assert response.status_code == 201
+    return response.get_json()['upload_id']
+
+
+def _put(client, upload_id, offset, chunk, checksum=None):
+    headers = {'X-Chunk-SHA256': checksum} if checksum else {}
+    return client.put(f'/api/upload/{upload_id}?offset={offset}', data=chunk, headers=headers)
+
+
+def _upload_path(client):
+    with client.session_transaction() as flask_session:
+        session_id = flask_session['session_id']
+    return app_module.session_store.get(session_id)['upload']['path']
+
+
+def test_put_at_the_wrong_offset_is_rejected_with_the_current_offset():
+    client = app_module.app.test_client()
+    upload_id = _start_upload(client)
+    assert _put(client, upload_id, 0, FIRST).get_json()['offset'] == len(FIRST)
+
+    response = _put(client, upload_id, 0, FIRST)
+    assert response.status_code == 409
+    assert response.get_json()['offset'] == len(FIRST)
+    assert os.path.getsize(_upload_path(client)) == len(FIRST)
+
+
+def test_checksum_mismatch_rolls_back_and_the_upload_resumes():
+    client = app_module.app.test_client()
+    upload_id = _start_upload(client)
+    _put(client, upload_id, 0, FIRST, hashlib.sha256(FIRST).hexdigest())
+
+    response = _put(client, upload_id, len(FIRST), SECOND, hashlib.sha256(b'something else').hexdigest())
+    assert response.status_code == 422
+    assert response.get_json()['offset'] == len(FIRST)
+    path = _upload_path(client)
+    assert os.path.getsize(path) == len(FIRST)
+
+    response = _put(client, upload_id, len(FIRST), SECOND, hashlib.sha256(SECOND).hexdigest())
+    assert response.status_code == 200
+    assert response.get_json()['offset'] == len(CONTENT)
+    with open(path, 'rb') as f:
+        assert f.read() == CONTENT
+    # The running checksum was rolled back along with the file
+    assert finalize_upload(upload_id, path, len(CONTENT)) == hashlib.sha256(CONTENT).hexdigest()
+
+
+def test_finalize_refuses_an_incomplete_upload():
+    client = app_module.app.test_client()
+    upload_id = _start_upload(client)
+    _put(client, upload_id, 0, FIRST)
+
+    response = client.post(f'/api/upload/{upload_id}/finalize', json={})
+    assert response.status_code == 409
+    assert response.get_json()['offset'] == len(FIRST)
+    assert client.get(f'/api/upload/{upload_id}').get_json()['offset'] == len(FIRST)
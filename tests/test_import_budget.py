@@ -0,0 +1,38 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Same budget as benchmarks/bench_import.py
+BUDGET_MS = 750
+RUNS = 3
+
+# Imported on first use only; none may be loaded by `import app`
+HEAVY_MODULES = ['numpy', 'ffmpeg', 'faster_whisper', 'pydub', 'gtts', 'moviepy', 'translate', 'pysrt']
+
+_CHILD = f"""
+import json, sys, time
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+print(json.dumps({{'ms': elapsed * 1000, 'heavy': [name for name in {HEAVY_MODULES!r} if name in sys.modules]}}))
+"""
+
+
+def _import_app(tmp_path):
+    env = dict(os.environ, SESSION_DB_PATH=str(tmp_path / 'sessions.sqlite3'), METRICS_DIR='off')
+    output = subprocess.run([sys.executable, '-c', _CHILD], cwd=ROOT, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_import_app_skips_heavy_modules(tmp_path):
+    assert _import_app(tmp_path)['heavy'] == []
+
+
+def test_import_app_within_budget(tmp_path):
+    times_ms = [_import_app(tmp_path)['ms'] for _ in range(RUNS)]
+    assert statistics.median(times_ms) < BUDGET_MS
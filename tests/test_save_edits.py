@@ -0,0 +1,70 @@
+import os
+
+os.environ.setdefault('SESSION_STORE', 'memory')
+os.environ.setdefault('METRICS_DIR', 'off')
+
+import app as app_module
+from utils.cues import CueList
+
+
+def _session_with_cues(client, texts):
+    client.get('/api/subtitles')
+    with client.session_transaction() as flask_session:
+        session_id = flask_session['session_id']
+
+    cues = CueList()
+    for i, text in enumerate(texts):
+        cues.append(i * 1000, i * 1000 + 800, text)
+
+    def seed(data):
+        data['original_cues'] = cues.to_dict()
+        data['targets'] = ['es']
+        data['translations'] = {'es': {'cues': cues.to_dict()}}
+
+    app_module.session_store.update(session_id, seed)
+
+
+def test_edits_round_trip_through_client_indexes():
+    client = app_module.app.test_client()
+    _session_with_cues(client, ['one', 'two', 'three'])
+
+    served = client.get('/api/subtitles').get_json()['translated_subtitles']
+    edits = [{'index': cue['index'], 'text': cue['text'].upper()} for cue in served]
+    response = client.post('/api/save-edits', json={'edited_subtitles': edits, 'language': 'es'})
+    assert response.status_code == 200
+
+    saved = client.get('/api/subtitles').get_json()['translated_subtitles']
+    assert [(cue['index'], cue['text']) for cue in saved] == [(1, 'ONE'), (2, 'TWO'), (3, 'THREE')]
+
+
+def test_edit_addresses_a_single_cue_by_client_index():
+    client = app_module.app.test_client()
+    _session_with_cues(client, ['one', 'two', 'three'])
+
+    response = client.post('/api/save-edits', json={'edited_subtitles': [{'index': 3, 'text': 'last'}]})
+    assert response.status_code == 200
+
+    saved = client.get('/api/subtitles').get_json()['translated_subtitles']
+    assert [cue['text'] for cue in saved] == ['one', 'two', 'last']
+
+
+def test_edit_with_a_non_numeric_index_is_rejected():
+    client = app_module.app.test_client()
+    _session_with_cues(client, ['one', 'two'])
+
+    edits = [{'index': 1, 'text': 'first'}, {'index': 'second', 'text': 'x'}]
+    response = client.post('/api/save-edits', json={'edited_subtitles': edits})
+    assert response.status_code == 400
+    assert response.get_json()['position'] == 1
+
+    saved = client.get('/api/subtitles').get_json()['translated_subtitles']
+    assert [cue['text'] for cue in saved] == ['one', 'two']
+
+
+def test_edit_without_text_is_rejected():
+    client = app_module.app.test_client()
+    _session_with_cues(client, ['one', 'two'])
+
+    response = client.post('/api/save-edits', json={'edited_subtitles': [{'index': 2}]})
+    assert response.status_code == 400
+    assert response.get_json()['position'] == 0
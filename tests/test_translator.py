@@ -0,0 +1,59 @@
+from utils.translation_engines import EchoTranslationEngine, TranslationEngine, pack_batch, unpack_batch
+from utils.translation_cache import TranslationCache
+from utils.translator import translate_texts
+
+
+class ScriptedEngine(TranslationEngine):
+    """Engine that upper-cases single texts and rewrites packed batches with reply()"""
+
+    name = 'scripted'
+
+    def __init__(self, reply=None):
+        self.reply = reply
+        self.calls = []
+
+    def translate(self, text, target_lang, source_lang):
+        self.calls.append(text)
+        if "\n" in text and self.reply is not None:
+            return self.reply(text)
+        return "\n".join(line.upper() for line in text.split("\n"))
+
+
+def test_texts_that_look_like_markers_round_trip():
+    texts = ['[3] already numbered', 'see [1]', '[0]', 'plain']
+    assert unpack_batch(pack_batch(texts), len(texts)) == texts
+    translated = EchoTranslationEngine().translate_batch(texts, 'es', 'en')
+    assert translated == [f"{text} (es)" for text in texts]
+
+
+def test_dropped_marker_falls_back_to_one_request_per_text():
+    def drop_marker(packed):
+        lines = packed.upper().split("\n")
+        lines[1] = lines[1].split('] ', 1)[1]
+        return "\n".join(lines)
+
+    engine = ScriptedEngine(drop_marker)
+    texts = ['one', 'two', 'three']
+    assert engine.translate_batch(texts, 'es', 'en') == ['ONE', 'TWO', 'THREE']
+    assert engine.calls[1:] == texts
+
+
+def test_reordered_markers_fall_back_to_one_request_per_text():
+    engine = ScriptedEngine(lambda packed: "\n".join(reversed(packed.upper().split("\n"))))
+    texts = ['one', 'two', 'three']
+    assert engine.translate_batch(texts, 'es', 'en') == ['ONE', 'TWO', 'THREE']
+    assert engine.calls[1:] == texts
+
+
+def test_duplicated_marker_falls_back_to_one_request_per_text():
+    engine = ScriptedEngine(lambda packed: "[0] ONE\n[0] TWO\n[1] THREE")
+    assert engine.translate_batch(['one', 'two'], 'es', 'en') == ['ONE', 'TWO']
+
+
+def test_deduplicated_texts_map_back_to_every_position(tmp_path):
+    engine = ScriptedEngine()
+    cache = TranslationCache(str(tmp_path / 'translations.sqlite3'))
+    texts = ['hello', 'bye', 'hello', '', 'bye', 'hello']
+    result = translate_texts(texts, 'es', 'en', engine=engine, cache=cache, max_workers=1)
+    assert result == ['HELLO', 'BYE', 'HELLO', '', 'BYE', 'HELLO']
+    assert engine.calls == [pack_batch(['hello', 'bye'])]
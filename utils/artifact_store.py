@@ -0,0 +1,250 @@
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+ARTIFACT_DIR = os.environ.get('ARTIFACT_DIR', os.path.join(tempfile.gettempdir(), 'videodub_artifacts'))
+ARTIFACT_CACHE_MAX_MB = int(os.environ.get('ARTIFACT_CACHE_MAX_MB', 4096))
+
+VIDEO_ARTIFACT = 'video.mp4'
+AUDIO_ARTIFACT = 'audio.wav'
+
+
+def transcript_artifact(model_size):
+    return f"segments_{model_size}.json"
+
+
+def translation_artifact(model_size, engine_name, source_lang, target_lang):
+    return f"translation_{model_size}_{engine_name}_{source_lang}_{target_lang}.json"
+
+
+class ArtifactStore:
+    """
+    Content-addressed store of uploaded videos and what was derived from them
+
+    Artifacts (the video itself, extracted audio, transcriptions per model,
+    translations) are grouped under the sha256 of the video, so a repeat
+    upload of the same file finds everything computed before. An SQLite
+    index shared by all worker processes tracks sizes, last use and which
+    holders (sessions) reference a video. When the store grows past
+    max_bytes, whole videos that nobody references are evicted, least
+    recently used first; referenced videos are never removed, even if that
+    leaves the store over budget.
+
+    Args:
+        directory: Root directory of the store
+        max_bytes: Size budget for all artifacts
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS artifacts ("
+                " video_hash TEXT NOT NULL, name TEXT NOT NULL, size INTEGER NOT NULL,"
+                " PRIMARY KEY (video_hash, name))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS videos (video_hash TEXT PRIMARY KEY, last_used REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS refs ("
+                " video_hash TEXT NOT NULL, holder TEXT NOT NULL, PRIMARY KEY (video_hash, holder))"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(os.path.join(self.directory, 'index.sqlite3'), timeout=30)
+
+    def _video_dir(self, video_hash):
+        return os.path.join(self.directory, video_hash[:2], video_hash)
+
+    def path(self, video_hash, name):
+        return os.path.join(self._video_dir(video_hash), name)
+
+    def acquire(self, video_hash, holder):
+        """Reference a video so its artifacts survive eviction"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("INSERT OR IGNORE INTO refs (video_hash, holder) VALUES (?, ?)", (video_hash, holder))
+        finally:
+            conn.close()
+
+    def release(self, holder, video_hash=None):
+        """Drop the references of a holder (to one video, or to all)"""
+        conn = self._connect()
+        try:
+            with conn:
+                if video_hash is None:
+                    conn.execute("DELETE FROM refs WHERE holder = ?", (holder,))
+                else:
+                    conn.execute("DELETE FROM refs WHERE video_hash = ? AND holder = ?", (video_hash, holder))
+        finally:
+            conn.close()
+
+    def get(self, video_hash, name):
+        """
+        Look up an artifact
+
+        Returns:
+            str: Path of the artifact, or None if it is not stored
+        """
+        conn = self._connect()
+        try:
+            with conn:
+                row = conn.execute("SELECT size FROM artifacts WHERE video_hash = ? AND name = ?",
+                                   (video_hash, name)).fetchone()
+                path = self.path(video_hash, name)
+                if row is not None and not os.path.exists(path):
+                    # Removed behind the index's back
+                    conn.execute("DELETE FROM artifacts WHERE video_hash = ? AND name = ?", (video_hash, name))
+                    row = None
+                if row is not None:
+                    conn.execute("UPDATE videos SET last_used = ? WHERE video_hash = ?", (time.time(), video_hash))
+        finally:
+            conn.close()
+        with self._lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return path if row is not None else None
+
+    def put_file(self, video_hash, name, source_path):
+        """
+        Move a finished file into the store
+
+        Returns:
+            str: Path of the stored artifact
+        """
+        path = self.path(video_hash, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.replace(source_path, path)
+        except OSError:
+            # Different filesystem: copy next to the target, then rename
+            tmp_path = path + '.tmp'
+            shutil.copyfile(source_path, tmp_path)
+            os.replace(tmp_path, path)
+            os.remove(source_path)
+        self._record(video_hash, name, os.path.getsize(path))
+        return path
+
+    def get_json(self, video_hash, name):
+        path = self.get(video_hash, name)
+        if path is None:
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put_json(self, video_hash, name, value):
+        directory = self._video_dir(video_hash)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(value, f)
+        return self.put_file(video_hash, name, tmp_path)
+
+    def adopt_video(self, video_hash, video_path):
+        """
+        Store an uploaded video, or drop it in favour of the stored copy
+
+        Returns:
+            str: Path of the stored video
+        """
+        existing = self.get(video_hash, VIDEO_ARTIFACT)
+        if existing is not None:
+            os.remove(video_path)
+            return existing
+        return self.put_file(video_hash, VIDEO_ARTIFACT, video_path)
+
+    def _record(self, video_hash, name, size):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO artifacts (video_hash, name, size) VALUES (?, ?, ?)",
+                             (video_hash, name, size))
+                conn.execute("INSERT OR REPLACE INTO videos (video_hash, last_used) VALUES (?, ?)",
+                             (video_hash, time.time()))
+        finally:
+            conn.close()
+        self.evict()
+
+    def evict(self):
+        """Remove unreferenced videos, least recently used first, until within budget"""
+        conn = self._connect()
+        try:
+            with conn:
+                # Take the write lock up front so no reference is added meanwhile
+                conn.execute("BEGIN IMMEDIATE")
+                total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM artifacts").fetchone()[0]
+                if total <= self.max_bytes:
+                    return 0
+                candidates = conn.execute(
+                    "SELECT v.video_hash, COALESCE(SUM(a.size), 0) FROM videos v"
+                    " LEFT JOIN artifacts a ON a.video_hash = v.video_hash"
+                    " WHERE v.video_hash NOT IN (SELECT video_hash FROM refs)"
+                    " GROUP BY v.video_hash ORDER BY v.last_used"
+                ).fetchall()
+                evicted = []
+                for video_hash, size in candidates:
+                    if total <= self.max_bytes:
+                        break
+                    conn.execute("DELETE FROM artifacts WHERE video_hash = ?", (video_hash,))
+                    conn.execute("DELETE FROM videos WHERE video_hash = ?", (video_hash,))
+                    evicted.append(video_hash)
+                    total -= size
+        finally:
+            conn.close()
+        for video_hash in evicted:
+            shutil.rmtree(self._video_dir(video_hash), ignore_errors=True)
+        with self._lock:
+            self.evictions += len(evicted)
+        return len(evicted)
+
+    def stats(self):
+        conn = self._connect()
+        try:
+            videos, size = conn.execute(
+                "SELECT COUNT(DISTINCT video_hash), COALESCE(SUM(size), 0) FROM artifacts").fetchone()
+            referenced = conn.execute("SELECT COUNT(DISTINCT video_hash) FROM refs").fetchone()[0]
+        finally:
+            conn.close()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'videos': videos,
+                'referenced_videos': referenced,
+                'size_bytes': size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else None,
+                'evictions': self.evictions,
+            }
+
+
+_artifact_store = None
+_artifact_store_lock = threading.Lock()
+
+
+def get_artifact_store():
+    """Get or create the shared artifact store (None when disabled)"""
+    global _artifact_store
+    with _artifact_store_lock:
+        if _artifact_store is None and ARTIFACT_CACHE_MAX_MB > 0:
+            _artifact_store = ArtifactStore(ARTIFACT_DIR, ARTIFACT_CACHE_MAX_MB * 1024 * 1024)
+        return _artifact_store
@@ -1,87 +1,364 @@
-import pysrt
-from gtts import gTTS
-from pydub import AudioSegment
+import json
 import os
 import tempfile
+import threading
+import time
+import wave
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 
-def generate_dubbed_audio(subtitle_path, output_audio_path, language):
+from utils.audio_timeline import AudioTimeline
+from utils.clip_cache import ClipCache
+from utils.cues import CueList
+from utils.metrics import TTS_CACHE_LOOKUPS, TTS_CALLS
+from utils.rate_limiter import RateLimiter
+from utils.time_stretch import stretch_rate, wsola
+from utils.tts_engines import get_tts_engine
+
+# Concurrency and throttling for TTS requests
+TTS_WORKERS = int(os.environ.get('TTS_WORKERS', 4))
+TTS_RETRIES = int(os.environ.get('TTS_RETRIES', 3))
+TTS_BACKOFF = float(os.environ.get('TTS_BACKOFF', 0.5))
+TTS_RATE_LIMIT = float(os.environ.get('TTS_RATE_LIMIT', 5))
+
+# Decoded clip cache shared by all jobs; TTS_CACHE_MAX_MB=0 disables it
+TTS_CACHE_DIR = os.environ.get('TTS_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'videodub_tts_cache'))
+TTS_CACHE_MAX_MB = int(os.environ.get('TTS_CACHE_MAX_MB', 512))
+
+# Largest speed-up applied to a clip that does not fit its cue
+MAX_STRETCH = float(os.environ.get('MAX_STRETCH', 1.5))
+
+# Shared across jobs so concurrent dubs stay under the provider limit together
+_rate_limiter = RateLimiter(TTS_RATE_LIMIT, burst=TTS_WORKERS)
+
+_clip_cache = None
+_clip_cache_lock = threading.Lock()
+
+def get_clip_cache():
+    """Get or create the shared TTS clip cache (None when disabled)"""
+    global _clip_cache
+    # Stage 2 dubs every language on its own thread, all sharing one cache
+    with _clip_cache_lock:
+        if _clip_cache is None and TTS_CACHE_MAX_MB > 0:
+            _clip_cache = ClipCache(TTS_CACHE_DIR, TTS_CACHE_MAX_MB * 1024 * 1024)
+        return _clip_cache
+
+def synthesize_with_retry(engine, text, language, retries=TTS_RETRIES, backoff=TTS_BACKOFF, rate_limiter=None):
+    """
+    Synthesize one cue, retrying with exponential backoff
+
+    Args:
+        engine: TTSEngine used for synthesis
+        text: Text to speak
+        language: Language code for text-to-speech
+        retries: Number of retries after the first failed attempt
+        backoff: Initial delay in seconds between attempts, doubled each retry
+        rate_limiter: Optional RateLimiter acquired before every attempt
+
+    Returns:
+        numpy.ndarray: int16 samples, or None if every attempt failed
+    """
+    for attempt in range(retries + 1):
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        try:
+            clip = engine.synthesize(text, language)
+            TTS_CALLS.inc(engine=engine.name, result='ok')
+            return clip
+        except Exception:
+            TTS_CALLS.inc(engine=engine.name, result='error')
+            if attempt < retries:
+                time.sleep(backoff * (2 ** attempt))
+    return None
+
+def synthesize_cached(engine, text, language, cache=None, rate_limiter=None):
+    """
+    Synthesize one cue, serving it from the clip cache when possible
+
+    Args:
+        engine: TTSEngine used for synthesis
+        text: Text to speak
+        language: Language code for text-to-speech
+        cache: Optional ClipCache
+        rate_limiter: Optional RateLimiter acquired before every TTS request
+
+    Returns:
+        numpy.ndarray: int16 samples, or None if synthesis failed
+    """
+    if cache is None:
+        return synthesize_with_retry(engine, text, language, rate_limiter=rate_limiter)
+
+    key = ClipCache.make_key(engine, language, text)
+    clip = cache.get(key)
+    TTS_CACHE_LOOKUPS.inc(result='hit' if clip is not None else 'miss')
+    if clip is None:
+        clip = synthesize_with_retry(engine, text, language, rate_limiter=rate_limiter)
+        if clip is not None:
+            cache.put(key, clip, engine.sample_rate)
+    return clip
+
+def synthesize_cues(texts, language, engine, max_workers=TTS_WORKERS, rate_limiter=None, cache=None):
+    """
+    Synthesize many texts concurrently
+
+    Args:
+        texts: List of texts to speak
+        language: Language code for text-to-speech
+        engine: TTSEngine used for synthesis
+        max_workers: Size of the worker pool
+        rate_limiter: Optional RateLimiter shared by all workers
+        cache: Optional ClipCache consulted before synthesizing
+
+    Returns:
+        iterator: Clips (or None on failure) in the same order as texts
+    """
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    try:
+        for clip in executor.map(
+            lambda text: synthesize_cached(engine, text, language, cache=cache, rate_limiter=rate_limiter),
+            texts
+        ):
+            yield clip
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def fit_clip(clip, slot_ms, sample_rate, max_rate=MAX_STRETCH):
+    """
+    Time-compress a clip that is longer than its slot, keeping its pitch
+
+    The speed-up is capped at max_rate; a clip that still does not fit runs
+    past its slot and is mixed over whatever follows.
+    """
+    rate = stretch_rate(len(clip), int(slot_ms * sample_rate / 1000), max_rate)
+    return clip if rate == 1.0 else wsola(clip, rate, sample_rate)
+
+def cue_slots(cues):
+    """
+    Time each cue's clip may occupy, in milliseconds
+
+    A clip may borrow the silence up to the next cue's start before it is
+    compressed.
+
+    Args:
+        cues: List of [start_ms, end_ms, text] sorted by start time
+
+    Returns:
+        list: Slot length of every cue in milliseconds
+    """
+    slots = []
+    for i, (start_ms, end_ms, _) in enumerate(cues):
+        next_start = cues[i + 1][0] if i + 1 < len(cues) else end_ms
+        slots.append(max(end_ms, next_start) - start_ms)
+    return slots
+
+def manifest_path(audio_path):
+    """Path of the cue manifest stored next to a dubbed audio file"""
+    return audio_path + '.cues.json'
+
+def load_manifest(audio_path):
+    """Load the cue manifest of a dubbed audio file, or None if missing or unreadable"""
+    try:
+        with open(manifest_path(audio_path), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_manifest(audio_path, manifest):
+    # Written atomically so a crash never leaves a manifest that lies about the audio
+    directory = os.path.dirname(os.path.abspath(audio_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path(audio_path))
+
+def _ms_to_samples(ms, sample_rate):
+    return int(round(ms * sample_rate / 1000.0))
+
+def _merge_ranges(ranges):
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+def _wav_data_offset(audio_path, sample_rate, total_samples):
+    """Byte offset of the samples in a 16-bit mono WAV file, or None if it does not match"""
+    with wave.open(audio_path, 'rb') as wav_file:
+        if (wav_file.getnchannels() != 1 or wav_file.getsampwidth() != 2
+                or wav_file.getframerate() != sample_rate or wav_file.getnframes() != total_samples):
+            return None
+    return os.path.getsize(audio_path) - total_samples * 2
+
+def _render_full(output_audio_path, cues, total_duration, language, engine, cache, max_workers, progress):
+    timeline = AudioTimeline(total_duration, sample_rate=engine.sample_rate)
+
+    clips = synthesize_cues(
+        [text for _, _, text in cues], language, engine,
+        max_workers=max_workers,
+        rate_limiter=_rate_limiter if engine.remote else None,
+        cache=cache
+    )
+
+    spans = []
+    slots = cue_slots(cues)
+    for done, ((start_ms, _, _), slot_ms, clip) in enumerate(zip(cues, slots, clips), 1):
+        if progress is not None:
+            progress(done, len(cues))
+        # If TTS fails for this segment, the timeline stays silent there
+        if clip is None:
+            spans.append(None)
+            continue
+        clip = fit_clip(clip, slot_ms, timeline.sample_rate)
+        timeline.mix(clip, start_ms)
+        start = _ms_to_samples(start_ms, timeline.sample_rate)
+        spans.append([start, start + len(clip)])
+
+    # Export the timeline as a WAV file
+    timeline.write_wav(output_audio_path)
+    return timeline, spans
+
+def _render_patch(output_audio_path, manifest, cues, language, engine, cache, max_workers, progress):
+    """
+    Re-synthesize only the changed cues and rewrite their sample ranges in place
+
+    Returns:
+        tuple: (spans, changed_count), or None when a full render is needed
+    """
+    old_cues = manifest['cues']
+    if len(old_cues) != len(cues):
+        return None
+    # Cues whose synthesis failed last time are retried, and a cue whose
+    # neighbour moved may have a different slot even if it did not change
+    slots = cue_slots(cues)
+    old_slots = cue_slots([old[:3] for old in old_cues])
+    changed = [i for i, (cue, old) in enumerate(zip(cues, old_cues))
+               if old[3] is None or list(cue) != old[:3] or slots[i] != old_slots[i]]
+    if len(changed) * 2 > len(cues):
+        return None
+
+    sample_rate = engine.sample_rate
+    total_samples = manifest['total_samples']
+    data_offset = _wav_data_offset(output_audio_path, sample_rate, total_samples)
+    if data_offset is None:
+        return None
+
+    spans = [old[3] for old in old_cues]
+    dirty = [spans[i] for i in changed if spans[i] is not None]
+    clips = {}
+    rendered = synthesize_cues(
+        [cues[i][2] for i in changed], language, engine,
+        max_workers=max_workers,
+        rate_limiter=_rate_limiter if engine.remote else None,
+        cache=cache
+    )
+    for done, (i, clip) in enumerate(zip(changed, rendered), 1):
+        if progress is not None:
+            progress(done, len(changed))
+        spans[i] = None
+        if clip is None:
+            continue
+        start_ms = cues[i][0]
+        clip = fit_clip(clip, slots[i], sample_rate)
+        start = _ms_to_samples(start_ms, sample_rate)
+        spans[i] = [start, start + len(clip)]
+        clips[i] = clip
+        dirty.append(spans[i])
+
+    # A clip that now runs past the end of the file needs a longer timeline
+    if any(span[1] > total_samples for span in dirty):
+        return None
+
+    # Previous render is about to be modified; drop its manifest until it is consistent again
+    os.remove(manifest_path(output_audio_path))
+
+    with open(output_audio_path, 'r+b') as f:
+        for start, end in _merge_ranges(dirty):
+            buffer = np.zeros(end - start, dtype=np.int32)
+            # Unchanged cues overlapping the range are mixed back in from the clip cache
+            for i, span in enumerate(spans):
+                if span is None or span[1] <= start or span[0] >= end:
+                    continue
+                clip = clips.get(i)
+                if clip is None:
+                    clip = synthesize_cached(engine, cues[i][2], language, cache=cache,
+                                             rate_limiter=_rate_limiter if engine.remote else None)
+                    if clip is None:
+                        spans[i] = None
+                        continue
+                    clip = fit_clip(clip, slots[i], sample_rate)
+                low, high = max(start, span[0]), min(end, span[1], span[0] + len(clip))
+                buffer[low - start:high - start] += clip[low - span[0]:high - span[0]]
+            np.clip(buffer, -32768, 32767, out=buffer)
+            f.seek(data_offset + start * 2)
+            f.write(buffer.astype(np.int16).tobytes())
+
+    return spans, len(changed)
+
+def generate_dubbed_audio(subtitles, output_audio_path, language, engine=None, max_workers=TTS_WORKERS, cache=None,
+                          progress=None, incremental=True):
     """
     Generate dubbed audio from translated subtitles with proper timing
-    
+
+    Cues are synthesized concurrently and each clip is mixed into a
+    preallocated timeline at its cue start time, so overlapping cues are
+    mixed rather than pushed later. Clips already in the clip cache (e.g.
+    unchanged lines after an edit) are not synthesized again.
+
+    A manifest of the rendered cues is stored next to the output. When the
+    output is rendered again with mostly the same cues, only the changed
+    cues are synthesized and their sample ranges are rewritten in place.
+
     Args:
-        subtitle_path: Path to translated SRT subtitle file
+        subtitles: CueList of translated subtitles, or the path of an SRT file
         output_audio_path: Path where dubbed audio will be saved
         language: Language code for text-to-speech
+        engine: TTSEngine to use (defaults to the TTS_ENGINE setting)
+        max_workers: Number of cues synthesized concurrently
+        cache: ClipCache to use (defaults to the shared cache)
+        progress: Optional callback progress(cues_done, cues_total)
+        incremental: Patch a previous render of output_audio_path when possible
+
+    Returns:
+        dict: 'incremental' (whether a previous render was patched) and
+        'cues_rendered' (number of cues synthesized or mixed)
     """
     try:
-        # Load the subtitle file
-        subs = pysrt.open(subtitle_path, encoding='utf-8')
-        
-        # Initialize an empty AudioSegment
-        combined = AudioSegment.silent(duration=0)
-        
-        # Create a temporary directory for intermediate audio files
-        temp_dir = tempfile.mkdtemp()
-        
-        # Iterate through each subtitle
-        for index, sub in enumerate(subs):
-            start_time = sub.start.ordinal / 1000.0  # convert to seconds
-            end_time = sub.end.ordinal / 1000.0
-            text = sub.text.strip()
-            
-            if not text:
-                continue
-            
-            # Generate speech using gTTS
-            temp_audio_path = os.path.join(temp_dir, f'temp_{index}.mp3')
-            
-            try:
-                tts = gTTS(text, lang=language)
-                tts.save(temp_audio_path)
-                
-                # Load the temporary mp3 file
-                audio = AudioSegment.from_mp3(temp_audio_path)
-                
-                # Calculate the position to insert the audio
-                current_duration = len(combined)
-                silent_duration = start_time * 1000 - current_duration
-                
-                if silent_duration > 0:
-                    # Add silence to fill the gap between the current audio and the next subtitle
-                    combined += AudioSegment.silent(duration=silent_duration)
-                
-                # Calculate duration of subtitle segment
-                segment_duration = (end_time - start_time) * 1000
-                
-                # Speed up or slow down audio to fit the subtitle duration if needed
-                if len(audio) > segment_duration:
-                    # Speed up audio to fit
-                    speedup_factor = len(audio) / segment_duration
-                    audio = audio.speedup(playback_speed=speedup_factor)
-                elif len(audio) < segment_duration:
-                    # Add slight pause after audio
-                    audio = audio + AudioSegment.silent(duration=segment_duration - len(audio))
-                
-                # Append the audio to the combined AudioSegment
-                combined += audio
-                
-                # Clean up temporary file
-                if os.path.exists(temp_audio_path):
-                    os.remove(temp_audio_path)
-                    
-            except Exception as e:
-                # If TTS fails for this segment, add silence
-                segment_duration = (end_time - start_time) * 1000
-                combined += AudioSegment.silent(duration=segment_duration)
-        
-        # Export the combined audio as a WAV file
-        combined.export(output_audio_path, format='wav')
-        
-        # Clean up temporary directory
-        try:
-            os.rmdir(temp_dir)
-        except:
-            pass
-            
+        engine = engine or get_tts_engine()
+        cache = cache if cache is not None else get_clip_cache()
+
+        if not isinstance(subtitles, CueList):
+            subtitles = CueList.read_srt(subtitles)
+        cues = [[start, end, text] for start, end, text in subtitles if text]
+
+        # Allocate the whole dub once, sized by the last subtitle cue
+        total_duration = subtitles.duration
+
+        manifest = load_manifest(output_audio_path) if incremental and os.path.exists(output_audio_path) else None
+        if (manifest is not None and manifest.get('engine') == engine.cache_key
+                and manifest.get('language') == language and manifest.get('sample_rate') == engine.sample_rate
+                and manifest.get('total_duration') == total_duration
+                and manifest.get('max_stretch') == MAX_STRETCH):
+            patched = _render_patch(output_audio_path, manifest, cues, language, engine, cache, max_workers, progress)
+            if patched is not None:
+                spans, changed = patched
+                manifest['cues'] = [cue + [span] for cue, span in zip(cues, spans)]
+                save_manifest(output_audio_path, manifest)
+                return {'incremental': True, 'cues_rendered': changed}
+
+        timeline, spans = _render_full(output_audio_path, cues, total_duration, language, engine, cache,
+                                       max_workers, progress)
+        save_manifest(output_audio_path, {
+            'engine': engine.cache_key,
+            'language': language,
+            'sample_rate': timeline.sample_rate,
+            'total_duration': total_duration,
+            'max_stretch': MAX_STRETCH,
+            'total_samples': len(timeline.samples),
+            'cues': [cue + [span] for cue, span in zip(cues, spans)]
+        })
+        return {'incremental': False, 'cues_rendered': len(cues)}
+
     except Exception as e:
         raise Exception(f"Error generating dubbed audio: {str(e)}")
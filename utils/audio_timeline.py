@@ -0,0 +1,86 @@
+import wave
+import numpy as np
+
+# gTTS produces 24 kHz mono MP3, so render the dub at the same rate
+DEFAULT_SAMPLE_RATE = 24000
+
+
+def segment_to_array(segment, sample_rate=DEFAULT_SAMPLE_RATE):
+    """
+    Convert a pydub AudioSegment to mono 16-bit samples
+
+    Args:
+        segment: pydub AudioSegment
+        sample_rate: Sample rate the samples should be resampled to
+
+    Returns:
+        numpy.ndarray: int16 mono samples
+    """
+    segment = segment.set_channels(1).set_frame_rate(sample_rate).set_sample_width(2)
+    return np.frombuffer(segment.raw_data, dtype=np.int16)
+
+
+def array_to_segment(samples, sample_rate=DEFAULT_SAMPLE_RATE):
+    """Wrap mono int16 samples in a pydub AudioSegment"""
+    from pydub import AudioSegment
+    return AudioSegment(
+        np.ascontiguousarray(samples, dtype=np.int16).tobytes(),
+        frame_rate=sample_rate,
+        sample_width=2,
+        channels=1
+    )
+
+
+class AudioTimeline:
+    """
+    Preallocated mono PCM buffer that clips are mixed into at their offsets
+
+    The buffer is allocated once for the whole dub, so placing a clip costs
+    only the length of that clip. Overlapping clips are summed (with
+    saturation) instead of being pushed later in time.
+
+    Args:
+        duration_ms: Total length of the timeline in milliseconds
+        sample_rate: Sample rate of the timeline
+    """
+
+    def __init__(self, duration_ms, sample_rate=DEFAULT_SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.samples = np.zeros(self.ms_to_samples(duration_ms), dtype=np.int16)
+
+    def ms_to_samples(self, ms):
+        return int(round(ms * self.sample_rate / 1000.0))
+
+    @property
+    def duration_ms(self):
+        return len(self.samples) * 1000.0 / self.sample_rate
+
+    def mix(self, clip, start_ms):
+        """
+        Mix int16 samples into the timeline starting at start_ms
+
+        Args:
+            clip: int16 mono samples at the timeline sample rate
+            start_ms: Position of the first sample in milliseconds
+        """
+        if len(clip) == 0:
+            return
+        start = max(0, self.ms_to_samples(start_ms))
+        end = start + len(clip)
+        if end > len(self.samples):
+            # A clip that runs past the last cue extends the timeline
+            self.samples = np.concatenate([
+                self.samples, np.zeros(end - len(self.samples), dtype=np.int16)
+            ])
+        target = self.samples[start:end]
+        mixed = target.astype(np.int32) + clip
+        np.clip(mixed, -32768, 32767, out=mixed)
+        target[:] = mixed
+
+    def write_wav(self, output_path):
+        """Write the timeline as a 16-bit mono WAV file"""
+        with wave.open(output_path, 'wb') as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(self.sample_rate)
+            wav_file.writeframes(self.samples.tobytes())
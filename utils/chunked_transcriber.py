@@ -0,0 +1,336 @@
+import multiprocessing
+import os
+import wave
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.transcriber import (
+    TRANSCRIBE_OPTIONS, WHISPER_COMPUTE_TYPE, WHISPER_MODEL, WHISPER_NUM_WORKERS, get_whisper_model,
+    load_whisper_model, report_segment_progress
+)
+from utils.video_processor import get_media_duration, stream_audio
+
+# Parallel transcription is enabled when more than one process is configured
+TRANSCRIBE_PROCESSES = int(os.environ.get('TRANSCRIBE_PROCESSES', 1))
+TRANSCRIBE_CHUNK_SECONDS = float(os.environ.get('TRANSCRIBE_CHUNK_SECONDS', 120))
+
+# Whisper expects 16 kHz mono audio
+SAMPLE_RATE = 16000
+
+# Segments repeated across a chunk boundary within this gap are dropped
+_BOUNDARY_DEDUP_SECONDS = 1.0
+
+
+class TranscribedSegment:
+    """Picklable stand-in for faster-whisper's Segment with absolute times"""
+
+    __slots__ = ('start', 'end', 'text')
+
+    def __init__(self, start, end, text):
+        self.start = start
+        self.end = end
+        self.text = text
+
+
+def read_wav(audio_path):
+    """
+    Read a 16-bit mono WAV file
+
+    Returns:
+        tuple: (int16 samples, sample_rate)
+    """
+    with wave.open(audio_path, 'rb') as wav_file:
+        if wav_file.getnchannels() != 1 or wav_file.getsampwidth() != 2:
+            raise ValueError("Expected 16-bit mono WAV audio")
+        frames = wav_file.readframes(wav_file.getnframes())
+        return np.frombuffer(frames, dtype=np.int16), wav_file.getframerate()
+
+
+def frame_energy(samples, sample_rate, frame_ms=30):
+    """RMS energy of consecutive frames, computed block-wise to bound memory"""
+    frame = max(1, int(sample_rate * frame_ms / 1000))
+    n_frames = len(samples) // frame
+    energy = np.empty(n_frames, dtype=np.float32)
+    block = 2000  # frames per block (one minute at 30 ms)
+    for i in range(0, n_frames, block):
+        j = min(n_frames, i + block)
+        frames = samples[i * frame:j * frame].astype(np.float32).reshape(j - i, frame)
+        energy[i:j] = np.sqrt(np.mean(frames * frames, axis=1))
+    return energy
+
+
+def find_split_points(samples, sample_rate, chunk_seconds, search_seconds=10.0, frame_ms=30):
+    """
+    Choose chunk boundaries inside the quietest stretch near every chunk_seconds
+
+    A simple energy-based voice activity detector: the frame energy is
+    smoothed over ~300 ms and the cut is placed at its minimum within
+    search_seconds of the ideal boundary, so words are not split.
+
+    Args:
+        samples: int16 mono samples
+        sample_rate: Sample rate of the samples
+        chunk_seconds: Target chunk length in seconds
+        search_seconds: How far from the target boundary to look for silence
+        frame_ms: Analysis frame length in milliseconds
+
+    Returns:
+        list: Sample indices where the audio should be split
+    """
+    energy = frame_energy(samples, sample_rate, frame_ms)
+    if len(energy) == 0:
+        return []
+    width = max(1, int(300 / frame_ms))
+    smoothed = np.convolve(energy, np.ones(width, dtype=np.float32) / width, mode='same')
+
+    frame = int(sample_rate * frame_ms / 1000)
+    step = int(chunk_seconds * 1000 / frame_ms)
+    search = int(search_seconds * 1000 / frame_ms)
+    splits = []
+    last = 0
+    target = step
+    # Leave the tail in the last chunk rather than creating a tiny one
+    while target < len(smoothed) - step // 4:
+        low = max(last + 1, target - search)
+        high = min(len(smoothed), target + search)
+        cut = low + int(np.argmin(smoothed[low:high]))
+        splits.append(cut * frame)
+        last = cut
+        target = cut + step
+    return splits
+
+
+def quietest_point(samples, sample_rate, low, high, frame_ms=30):
+    """Sample index of the quietest ~300 ms stretch between low and high"""
+    frame = max(1, int(sample_rate * frame_ms / 1000))
+    energy = frame_energy(samples[low:high], sample_rate, frame_ms)
+    if len(energy) == 0:
+        return high
+    width = max(1, int(300 / frame_ms))
+    smoothed = np.convolve(energy, np.ones(width, dtype=np.float32) / width, mode='same')
+    return low + int(np.argmin(smoothed)) * frame
+
+
+def split_stream(blocks, sample_rate, chunk_seconds, search_seconds=10.0):
+    """
+    Regroup streamed PCM blocks into chunks cut at silences
+
+    Only one chunk plus the search window is buffered at a time.
+
+    Args:
+        blocks: Iterable of int16 sample arrays (e.g. from stream_audio)
+        sample_rate: Sample rate of the blocks
+        chunk_seconds: Target chunk length in seconds
+        search_seconds: How far from the target boundary to look for silence
+
+    Yields:
+        tuple: (offset_in_samples, int16 samples)
+    """
+    target = int(chunk_seconds * sample_rate)
+    search = min(int(search_seconds * sample_rate), target // 4)
+    buffer = np.zeros(0, dtype=np.int16)
+    offset = 0
+    for block in blocks:
+        buffer = np.concatenate([buffer, block])
+        while len(buffer) >= target + search:
+            cut = max(1, quietest_point(buffer, sample_rate, target - search, target + search))
+            yield offset, buffer[:cut]
+            offset += cut
+            buffer = buffer[cut:]
+    if len(buffer):
+        yield offset, buffer
+
+
+def _shift_segments(segments, offset, duration):
+    for segment in segments:
+        # Keep timestamps inside the chunk before shifting them to absolute time
+        start = min(max(segment.start, 0.0), duration)
+        end = min(max(segment.end, start), duration)
+        yield TranscribedSegment(offset + start, offset + end, segment.text)
+
+
+# Worker process state
+_worker_model = None
+
+
+def _init_worker(model_size, compute_type, cpu_threads, num_workers):
+    global _worker_model
+    _worker_model = load_whisper_model(model_size, compute_type, cpu_threads, num_workers)
+
+
+def _detect_language(audio):
+    # faster-whisper detects the language eagerly before decoding starts
+    _, info = _worker_model.transcribe(audio, **TRANSCRIBE_OPTIONS)
+    return info.language
+
+
+def _transcribe_chunk(audio, offset, duration, language):
+    segments, _ = _worker_model.transcribe(audio, language=language, **TRANSCRIBE_OPTIONS)
+    return list(_shift_segments(segments, offset, duration))
+
+
+_pool = None
+_pool_config = None
+
+
+def get_transcription_pool(processes=TRANSCRIBE_PROCESSES, model_size=WHISPER_MODEL,
+                           compute_type=WHISPER_COMPUTE_TYPE, cpu_threads=None,
+                           num_workers=WHISPER_NUM_WORKERS):
+    """
+    Get or create the process pool, each process holding its own Whisper model
+
+    Args:
+        processes: Number of worker processes
+        model_size: Whisper model size loaded in every process
+        compute_type: CTranslate2 compute type
+        cpu_threads: Threads per model (defaults to an even share of the CPU cores)
+        num_workers: Concurrent transcriptions per model
+
+    Returns:
+        ProcessPoolExecutor: The shared pool
+    """
+    global _pool, _pool_config
+    if cpu_threads is None:
+        cpu_threads = max(1, (os.cpu_count() or 1) // processes)
+    config = (processes, model_size, compute_type, cpu_threads, num_workers)
+    if _pool is None or _pool_config != config:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        # Spawn instead of fork: the parent may already hold CTranslate2 threads
+        _pool = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=config[1:]
+        )
+        _pool_config = config
+    return _pool
+
+
+def _to_float(samples):
+    return samples.astype(np.float32) / 32768.0
+
+
+def stitch_segments(chunk_results):
+    """
+    Concatenate per-chunk segments, dropping text repeated across a boundary
+
+    Only the leading segments of a chunk are compared, against the last
+    segment of the chunk before it; lines repeated within a chunk are kept.
+
+    Args:
+        chunk_results: Iterable of segment lists in chunk order
+
+    Yields:
+        TranscribedSegment: Segments with absolute timestamps
+    """
+    boundary = None
+    for segments in chunk_results:
+        last = boundary
+        leading = True
+        for segment in segments:
+            if (leading and boundary is not None
+                    and segment.text.strip() == boundary.text.strip()
+                    and segment.start - boundary.end < _BOUNDARY_DEDUP_SECONDS):
+                continue
+            leading = False
+            yield segment
+            last = segment
+        boundary = last
+
+
+def transcribe_audio_parallel(audio_path, chunk_seconds=TRANSCRIBE_CHUNK_SECONDS, pool=None, progress=None,
+                              samples=None):
+    """
+    Transcribe a long audio file by splitting it at silences and decoding
+    the chunks in parallel worker processes
+
+    Args:
+        audio_path: Path to a 16 kHz mono WAV file (ignored when samples are given)
+        chunk_seconds: Target chunk length in seconds
+        pool: ProcessPoolExecutor to use (defaults to the shared pool)
+        progress: Optional callback progress(seconds_transcribed, duration)
+        samples: 16 kHz int16 mono samples already in memory (e.g. from decode_audio)
+
+    Returns:
+        tuple: (detected_language, segment_generator) where segments are
+        yielded in order as soon as their chunk and all earlier chunks are done
+    """
+    try:
+        pool = pool or get_transcription_pool()
+        if samples is not None:
+            sample_rate = SAMPLE_RATE
+        else:
+            samples, sample_rate = read_wav(audio_path)
+        if sample_rate != SAMPLE_RATE:
+            raise ValueError(f"Expected {SAMPLE_RATE} Hz audio, got {sample_rate} Hz")
+
+        # Detect the language once so every chunk is decoded consistently
+        language = pool.submit(_detect_language, _to_float(samples[:30 * SAMPLE_RATE])).result()
+
+        bounds = [0] + find_split_points(samples, sample_rate, chunk_seconds) + [len(samples)]
+        futures = [
+            pool.submit(_transcribe_chunk, _to_float(samples[start:end]),
+                        start / sample_rate, (end - start) / sample_rate, language)
+            for start, end in zip(bounds, bounds[1:])
+        ]
+    except Exception as e:
+        raise Exception(f"Error during transcription: {str(e)}")
+
+    def ordered_results():
+        try:
+            for future in futures:
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    duration = len(samples) / sample_rate
+    return language, report_segment_progress(stitch_segments(ordered_results()), duration, progress)
+
+
+def transcribe_media_stream(media_path, model_size=None, chunk_seconds=TRANSCRIBE_CHUNK_SECONDS, progress=None):
+    """
+    Transcribe the audio of a media file straight from an ffmpeg pipe
+
+    No WAV file is written: ffmpeg decodes to raw PCM, the stream is cut at
+    silences into chunk_seconds pieces and each piece is handed to Whisper
+    as a float32 array, so memory stays bounded by the chunk size.
+
+    Args:
+        media_path: Path to the video or audio file
+        model_size: Whisper model size (defaults to WHISPER_MODEL)
+        chunk_seconds: Target chunk length in seconds
+        progress: Optional callback progress(seconds_transcribed, duration)
+
+    Returns:
+        tuple: (detected_language, segment_generator)
+    """
+    try:
+        duration = None
+        if progress is not None:
+            try:
+                duration = get_media_duration(media_path)
+            except Exception:
+                pass
+        model = get_whisper_model(model_size)
+        chunks = split_stream(stream_audio(media_path, SAMPLE_RATE), SAMPLE_RATE, chunk_seconds)
+        first = next(chunks, None)
+        if first is None:
+            raise ValueError("The audio track is empty")
+
+        # faster-whisper detects the language eagerly on the first chunk;
+        # later chunks reuse it so they are decoded consistently
+        offset, samples = first
+        segments, info = model.transcribe(_to_float(samples), **TRANSCRIBE_OPTIONS)
+        language = info.language
+    except Exception as e:
+        raise Exception(f"Error during transcription: {str(e)}")
+
+    def chunk_segments():
+        yield _shift_segments(segments, offset / SAMPLE_RATE, len(samples) / SAMPLE_RATE)
+        for chunk_offset, chunk in chunks:
+            chunk_result, _ = model.transcribe(_to_float(chunk), language=language, **TRANSCRIBE_OPTIONS)
+            yield _shift_segments(chunk_result, chunk_offset / SAMPLE_RATE, len(chunk) / SAMPLE_RATE)
+
+    return language, report_segment_progress(stitch_segments(chunk_segments()), duration, progress)
@@ -0,0 +1,156 @@
+import fcntl
+import hashlib
+import os
+import threading
+
+from utils.metrics import BYTES_PROCESSED
+
+# Size clients should use for each PUT; the last chunk may be shorter
+UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_MB', 8)) * 1024 * 1024
+UPLOAD_MAX_BYTES = int(os.environ.get('UPLOAD_MAX_MB', 2048)) * 1024 * 1024
+
+# Bytes copied from the request stream per write
+_COPY_BLOCK = 1024 * 1024
+
+
+class OffsetMismatch(Exception):
+    """Raised when a chunk does not start at the committed offset"""
+
+    def __init__(self, expected):
+        super().__init__(f"Chunk must start at offset {expected}")
+        self.expected = expected
+
+
+class ChecksumMismatch(Exception):
+    """Raised when uploaded bytes do not match the checksum the client sent"""
+
+
+# Running sha256 per upload id, with the offset it covers. Another worker
+# process (or a restart) will not have it; the state is then rebuilt by
+# hashing the bytes already on disk.
+_hashers = {}
+_hashers_lock = threading.Lock()
+
+
+def committed_offset(path):
+    """Number of bytes of the upload safely written to disk"""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def create_upload(path):
+    """Create the empty target file for a new upload"""
+    open(path, 'wb').close()
+
+
+def _get_hasher(upload_id, path, offset):
+    with _hashers_lock:
+        entry = _hashers.get(upload_id)
+    if entry is not None and entry[0] == offset:
+        return entry[1]
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        remaining = offset
+        while remaining > 0:
+            block = f.read(min(_COPY_BLOCK, remaining))
+            if not block:
+                break
+            hasher.update(block)
+            remaining -= len(block)
+    return hasher
+
+
+def _set_hasher(upload_id, offset, hasher):
+    with _hashers_lock:
+        _hashers[upload_id] = (offset, hasher)
+
+
+def write_chunk(upload_id, path, offset, stream, total_size, chunk_sha256=None):
+    """
+    Append one chunk of an upload, streaming it straight into the target file
+
+    Args:
+        upload_id: Id of the upload (keys the running checksum)
+        path: Target file
+        offset: Offset the client claims the chunk starts at
+        stream: File-like object the chunk is read from (e.g. request.stream)
+        total_size: Declared size of the complete file
+        chunk_sha256: Optional hex sha256 of this chunk; on mismatch the
+            chunk is discarded
+
+    Returns:
+        int: The new committed offset
+    """
+    with open(path, 'r+b') as f:
+        # Serialise writers across threads and worker processes
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            committed = os.fstat(f.fileno()).st_size
+            if offset != committed:
+                raise OffsetMismatch(committed)
+            hasher = _get_hasher(upload_id, path, committed)
+            chunk_hasher = hashlib.sha256() if chunk_sha256 else None
+            before = hasher.copy()
+            f.seek(committed)
+            written = 0
+            try:
+                while True:
+                    block = stream.read(_COPY_BLOCK)
+                    if not block:
+                        break
+                    if committed + written + len(block) > total_size:
+                        raise ValueError("Chunk extends past the declared file size")
+                    f.write(block)
+                    hasher.update(block)
+                    if chunk_hasher is not None:
+                        chunk_hasher.update(block)
+                    written += len(block)
+                if chunk_hasher is not None and chunk_hasher.hexdigest() != chunk_sha256.lower():
+                    raise ChecksumMismatch("Chunk checksum does not match")
+            except (ValueError, ChecksumMismatch):
+                # Roll back to the last committed offset
+                f.truncate(committed)
+                _set_hasher(upload_id, committed, before)
+                raise
+            except Exception:
+                # A dropped connection keeps what arrived; the client resumes from there
+                f.flush()
+                _set_hasher(upload_id, committed + written, hasher)
+                raise
+            f.flush()
+            os.fsync(f.fileno())
+            _set_hasher(upload_id, committed + written, hasher)
+            BYTES_PROCESSED.inc(written, kind='upload')
+            return committed + written
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def finalize_upload(upload_id, path, total_size, expected_sha256=None):
+    """
+    Check that an upload is complete and matches its checksum
+
+    Args:
+        upload_id: Id of the upload
+        path: Target file
+        total_size: Declared size of the complete file
+        expected_sha256: Optional hex sha256 of the whole file
+
+    Returns:
+        str: Hex sha256 of the uploaded file
+    """
+    size = committed_offset(path)
+    if size != total_size:
+        raise ValueError(f"Upload incomplete: {size} of {total_size} bytes received")
+    digest = _get_hasher(upload_id, path, size).hexdigest()
+    discard_upload(upload_id)
+    if expected_sha256 and digest != expected_sha256.lower():
+        raise ChecksumMismatch("File checksum does not match")
+    return digest
+
+
+def discard_upload(upload_id):
+    with _hashers_lock:
+        _hashers.pop(upload_id, None)
@@ -0,0 +1,138 @@
+import hashlib
+import os
+import tempfile
+import threading
+import wave
+import numpy as np
+
+
+class ClipCache:
+    """
+    On-disk, content-addressed cache of synthesized TTS clips
+
+    Clips are stored as decoded 16-bit WAV files named by a hash of the
+    engine identity, language and text, so a cache hit skips both the TTS
+    request and the MP3 decode. Files are written atomically, which keeps
+    the cache safe to share between worker processes. When the cache grows
+    past max_bytes the least recently used clips are evicted.
+
+    Args:
+        directory: Directory holding the cached clips
+        max_bytes: Size budget for the cache directory
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(size for _, _, size in self._entries())
+
+    @staticmethod
+    def make_key(engine, language, text):
+        """Build the cache key for a clip"""
+        payload = f"{engine.cache_key}\0{language}\0{text}".encode('utf-8')
+        return hashlib.sha256(payload).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.wav")
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith('.wav'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_mtime, stat.st_size
+
+    def get(self, key):
+        """
+        Look up a clip
+
+        Args:
+            key: Key from make_key()
+
+        Returns:
+            numpy.ndarray: int16 samples, or None on a miss
+        """
+        path = self._path(key)
+        try:
+            with wave.open(path, 'rb') as wav_file:
+                samples = np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype=np.int16)
+            # Bump the modification time so eviction is least-recently-used
+            os.utime(path)
+        except (OSError, EOFError, wave.Error):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return samples
+
+    def put(self, key, samples, sample_rate):
+        """
+        Store a clip, evicting old clips if the cache is over budget
+
+        Args:
+            key: Key from make_key()
+            samples: int16 mono samples
+            sample_rate: Sample rate of the samples
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                with wave.open(f, 'wb') as wav_file:
+                    wav_file.setnchannels(1)
+                    wav_file.setsampwidth(2)
+                    wav_file.setframerate(sample_rate)
+                    wav_file.writeframes(np.ascontiguousarray(samples, dtype=np.int16).tobytes())
+                size = f.tell()
+            os.replace(temp_path, path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+
+        with self._lock:
+            self._size += size
+            over_budget = self._size > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def evict(self):
+        """Remove least recently used clips until the cache is under 90% of its budget"""
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda entry: entry[1])
+            size = sum(entry[2] for entry in entries)
+            target = self.max_bytes * 0.9
+            for path, _, entry_size in entries:
+                if size <= target:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                size -= entry_size
+                self.evictions += 1
+            self._size = size
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else None,
+                'evictions': self.evictions,
+                'size_bytes': self._size,
+                'max_bytes': self.max_bytes,
+            }
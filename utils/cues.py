@@ -0,0 +1,166 @@
+import os
+import re
+import tempfile
+from array import array
+
+_SRT_TIME = re.compile(r'(\d+):(\d{2}):(\d{2})[,.](\d{3})')
+
+
+def seconds_to_ms(seconds):
+    return int(round(seconds * 1000))
+
+
+def format_timestamp(ms, separator=','):
+    """
+    Format milliseconds as an SRT (HH:MM:SS,mmm) or, with '.', a VTT timestamp
+    """
+    hours, ms = divmod(int(ms), 3600000)
+    minutes, ms = divmod(ms, 60000)
+    seconds, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{ms:03d}"
+
+
+def parse_timestamp(text):
+    """Parse an SRT or VTT timestamp into milliseconds"""
+    match = _SRT_TIME.search(text)
+    if match is None:
+        raise ValueError(f"Invalid timestamp: {text!r}")
+    hours, minutes, seconds, ms = (int(part) for part in match.groups())
+    return ((hours * 60 + minutes) * 60 + seconds) * 1000 + ms
+
+
+class CueList:
+    """
+    Subtitle cues kept as parallel arrays: start and end in integer
+    milliseconds, and the text
+
+    This is the one representation of subtitles that flows through the
+    pipeline. SRT and VTT are only produced when exporting, and the compact
+    to_dict() form is what gets stored in the session.
+
+    Appends from one thread may race with reads from another (e.g. a
+    translator thread filling the list while the app publishes it); texts
+    are appended last and readers go by their length, so a reader sees
+    whole cues only.
+
+    Args:
+        starts: Start times in milliseconds
+        ends: End times in milliseconds
+        texts: Cue texts
+    """
+
+    __slots__ = ('starts', 'ends', 'texts')
+
+    def __init__(self, starts=(), ends=(), texts=()):
+        self.starts = array('q', starts)
+        self.ends = array('q', ends)
+        self.texts = list(texts)
+        if not len(self.starts) == len(self.ends) == len(self.texts):
+            raise ValueError("Cue starts, ends and texts must have the same length")
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __getitem__(self, index):
+        return self.starts[index], self.ends[index], self.texts[index]
+
+    def __iter__(self):
+        for index in range(len(self.texts)):
+            yield self.starts[index], self.ends[index], self.texts[index]
+
+    def append(self, start_ms, end_ms, text):
+        """
+        Add a cue at the end
+
+        Returns:
+            int: Index of the new cue
+        """
+        self.starts.append(int(start_ms))
+        self.ends.append(int(end_ms))
+        self.texts.append(text.strip())
+        return len(self.texts) - 1
+
+    def set_text(self, index, text):
+        self.texts[index] = text.strip()
+
+    def window(self, start_ms, end_ms):
+        """
+        Cues that start within [start_ms, end_ms), shifted so that start_ms
+        becomes 0 (e.g. to dub an excerpt of the video)
+        """
+        cues = CueList()
+        for start, end, text in self:
+            if start_ms <= start < end_ms:
+                cues.append(start - start_ms, end - start_ms, text)
+        return cues
+
+    @property
+    def duration(self):
+        """End of the last cue in milliseconds"""
+        return max(self.ends, default=0)
+
+    @classmethod
+    def from_segments(cls, segments):
+        """Build from transcription segments with start/end in seconds"""
+        cues = cls()
+        for segment in segments:
+            cues.append(seconds_to_ms(segment.start), seconds_to_ms(segment.end), segment.text)
+        return cues
+
+    def to_dict(self):
+        """Compact JSON-serialisable form, as stored in the session"""
+        count = len(self.texts)
+        return {'start': self.starts[:count].tolist(), 'end': self.ends[:count].tolist(),
+                'text': self.texts[:count]}
+
+    @classmethod
+    def from_dict(cls, data):
+        if not data:
+            return cls()
+        return cls(data['start'], data['end'], data['text'])
+
+    def to_client(self):
+        """Cues as the UI shows them: 1-based index and SRT timestamps"""
+        return [
+            {'index': index + 1, 'start': format_timestamp(start), 'end': format_timestamp(end), 'text': text}
+            for index, (start, end, text) in enumerate(self)
+        ]
+
+    def to_srt(self):
+        return ''.join(
+            f"{index + 1}\n{format_timestamp(start)} --> {format_timestamp(end)}\n{text}\n\n"
+            for index, (start, end, text) in enumerate(self)
+        )
+
+    def to_vtt(self):
+        return 'WEBVTT\n\n' + ''.join(
+            f"{format_timestamp(start, '.')} --> {format_timestamp(end, '.')}\n{text}\n\n"
+            for start, end, text in self
+        )
+
+    @classmethod
+    def from_srt(cls, text):
+        """Parse SRT (or VTT) text"""
+        cues = cls()
+        for block in re.split(r'\n\s*\n', text.lstrip('\ufeff').replace('\r\n', '\n').strip()):
+            lines = block.split('\n')
+            for i, line in enumerate(lines):
+                if '-->' in line:
+                    start, _, end = line.partition('-->')
+                    cues.append(parse_timestamp(start), parse_timestamp(end), '\n'.join(lines[i + 1:]))
+                    break
+        return cues
+
+    @classmethod
+    def read_srt(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_srt(f.read())
+
+    def write(self, path, format='srt'):
+        """Export to an SRT or VTT file, atomically"""
+        content = self.to_vtt() if format == 'vtt' else self.to_srt()
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
@@ -0,0 +1,271 @@
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+TIMED_OUT = 'timed_out'
+
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED, TIMED_OUT)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job function when the job was cancelled or timed out"""
+
+
+class Job:
+    """
+    A unit of background work tracked by the JobQueue
+
+    The job function receives the Job as its first argument and should call
+    job.check_cancelled() between steps so cancellation and timeouts take
+    effect (Python threads cannot be killed from the outside). Job functions
+    may append timing spans of their stages to job.trace.
+    """
+
+    def __init__(self, kind, func, args, kwargs, timeout=None, owner=None):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.owner = owner
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.timeout = timeout
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.trace = []
+        self._cancel_event = threading.Event()
+        self._cancel_reason = None
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    def cancel(self, reason=CANCELLED):
+        """Request cancellation; returns False if the job already finished"""
+        if self.finished:
+            return False
+        self._cancel_reason = reason
+        self._cancel_event.set()
+        return True
+
+    def is_cancelled(self):
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self):
+        """Raise JobCancelled if cancellation or a timeout was requested"""
+        if self._cancel_event.is_set():
+            if self._cancel_reason == TIMED_OUT:
+                raise JobCancelled(f"Job timed out after {self.timeout} seconds")
+            raise JobCancelled("Job was cancelled")
+
+    def to_dict(self, include_result=False, include_trace=False):
+        data = {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+        if include_result and self.status == COMPLETED:
+            data['result'] = self.result
+        if include_trace:
+            data['trace'] = [dict(span) for span in self.trace]
+        return data
+
+
+class JobQueue:
+    """
+    Bounded thread pool that runs pipeline jobs in the background
+
+    Args:
+        max_workers: Number of jobs allowed to run concurrently
+        default_timeout: Per-job timeout in seconds (None for no limit)
+        retention: Seconds a finished job stays queryable before being dropped
+        latency_window: Number of recent jobs used for latency metrics
+        on_update: Optional callback on_update(job) called whenever a job changes
+            state and periodically as a heartbeat while it is queued or running
+        cancel_check: Optional callback cancel_check(job) polled by the watchdog;
+            returning True cancels the job (e.g. a request made by another process)
+        heartbeat_interval: Seconds between on_update heartbeats
+    """
+
+    def __init__(self, max_workers=1, default_timeout=None, retention=3600, latency_window=100,
+                 on_update=None, cancel_check=None, heartbeat_interval=10):
+        self.max_workers = max(1, int(max_workers))
+        self.default_timeout = default_timeout
+        self.retention = retention
+        self.on_update = on_update
+        self.cancel_check = cancel_check
+        self.heartbeat_interval = heartbeat_interval
+        self._queue = queue.Queue()
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self._started = False
+        self._wait_times = deque(maxlen=latency_window)
+        self._run_times = deque(maxlen=latency_window)
+        self._counts = {state: 0 for state in FINISHED_STATES}
+        self._running = 0
+
+    def _ensure_started(self):
+        # Threads are started lazily so the queue survives gunicorn's fork
+        if self._started:
+            return
+        self._started = True
+        for i in range(self.max_workers):
+            thread = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        watchdog = threading.Thread(target=self._watchdog, name="job-watchdog", daemon=True)
+        watchdog.start()
+        self._threads.append(watchdog)
+
+    def submit(self, kind, func, *args, timeout=None, owner=None, **kwargs):
+        """
+        Enqueue func(job, *args, **kwargs) and return the Job immediately
+
+        Args:
+            kind: Short label for the job type (e.g. 'stage1')
+            func: Callable executed on a worker thread
+            timeout: Override for the default per-job timeout in seconds
+            owner: Opaque owner id (e.g. session id) used for access checks
+        """
+        job = Job(kind, func, args, kwargs,
+                  timeout=timeout if timeout is not None else self.default_timeout,
+                  owner=owner)
+        with self._lock:
+            self._ensure_started()
+            self._jobs[job.id] = job
+        self._notify(job)
+        self._queue.put(job)
+        return job
+
+    def _notify(self, job):
+        if self.on_update is None:
+            return
+        try:
+            self.on_update(job)
+        except Exception:
+            # A failing listener must not take the worker down
+            pass
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is None:
+            return False
+        cancelled = job.cancel()
+        # Jobs that never started are finalised right away
+        if cancelled and job.status == QUEUED:
+            self._finish(job, CANCELLED, error="Job was cancelled")
+        return cancelled
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job.finished:
+                    continue
+                self._run(job)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job):
+        with self._lock:
+            job.status = RUNNING
+            job.started_at = time.time()
+            self._running += 1
+            self._wait_times.append(job.started_at - job.created_at)
+        self._notify(job)
+        try:
+            job.check_cancelled()
+            result = job.func(job, *job.args, **job.kwargs)
+            job.check_cancelled()
+            self._finish(job, COMPLETED, result=result)
+        except JobCancelled as e:
+            state = TIMED_OUT if job._cancel_reason == TIMED_OUT else CANCELLED
+            self._finish(job, state, error=str(e))
+        except Exception as e:
+            self._finish(job, FAILED, error=str(e))
+
+    def _finish(self, job, state, result=None, error=None):
+        with self._lock:
+            if job.finished:
+                return
+            if job.status == RUNNING:
+                self._running -= 1
+            job.finished_at = time.time()
+            if job.started_at is not None:
+                self._run_times.append(job.finished_at - job.started_at)
+            job.result = result
+            job.error = error
+            job.status = state
+            self._counts[state] += 1
+        self._notify(job)
+
+    def _watchdog(self):
+        last_heartbeat = time.time()
+        while True:
+            time.sleep(1)
+            now = time.time()
+            heartbeat = now - last_heartbeat >= self.heartbeat_interval
+            if heartbeat:
+                last_heartbeat = now
+            with self._lock:
+                jobs = list(self._jobs.values())
+            for job in jobs:
+                if job.status == RUNNING and job.timeout and now - job.started_at > job.timeout:
+                    job.cancel(reason=TIMED_OUT)
+                elif job.finished and now - job.finished_at > self.retention:
+                    with self._lock:
+                        self._jobs.pop(job.id, None)
+                elif not job.finished and self.cancel_check is not None and self._safe_cancel_check(job):
+                    self.cancel(job.id)
+                elif not job.finished and heartbeat:
+                    self._notify(job)
+
+    def _safe_cancel_check(self, job):
+        try:
+            return self.cancel_check(job)
+        except Exception:
+            return False
+
+    def metrics(self):
+        """Queue depth and latency figures used to size the worker pool"""
+        def summarize(samples):
+            if not samples:
+                return {'count': 0, 'avg': None, 'p95': None, 'max': None}
+            ordered = sorted(samples)
+            return {
+                'count': len(ordered),
+                'avg': sum(ordered) / len(ordered),
+                'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                'max': ordered[-1],
+            }
+
+        with self._lock:
+            queued = sum(1 for job in self._jobs.values() if job.status == QUEUED)
+            return {
+                'workers': self.max_workers,
+                'queue_depth': queued,
+                'running': self._running,
+                'finished': dict(self._counts),
+                'wait_seconds': summarize(self._wait_times),
+                'run_seconds': summarize(self._run_times),
+            }
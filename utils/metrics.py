@@ -0,0 +1,319 @@
+import atexit
+import glob
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+
+# Every worker process writes its metrics here so any of them can serve the
+# totals; 'off' keeps metrics per process
+METRICS_DIR = os.environ.get('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'videodub_metrics'))
+METRICS_FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', 5))
+
+# Upper bounds of the duration histogram buckets in seconds
+DURATION_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+
+class Metric:
+    """
+    A named family of values keyed by label values
+
+    Args:
+        name: Prometheus metric name
+        help_text: Description shown in the exposition
+        labelnames: Names of the labels every value is keyed by
+    """
+
+    type = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+
+class Counter(Metric):
+    """Monotonically increasing total"""
+
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """Value that goes up and down, e.g. jobs in flight"""
+
+    type = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    """
+    Distribution of observations in cumulative buckets
+
+    Values are stored as [count per bucket..., sum, count].
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DURATION_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            values = self._values.get(key)
+            if values is None:
+                values = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    values[i] += 1
+            values[-2] += value
+            values[-1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(key), list(values)] for key, values in self._values.items()]
+
+
+class MetricsRegistry:
+    """
+    Collection of metrics rendered together in the Prometheus text format
+
+    With a shared directory every process periodically writes a snapshot of
+    its metrics there, and render() adds up the snapshots of all running
+    processes. A process removes its snapshot when it exits; snapshots left
+    behind by processes that died are ignored and deleted.
+
+    Args:
+        directory: Shared snapshot directory, or None to keep metrics per process
+        flush_interval: Seconds between snapshot writes
+    """
+
+    def __init__(self, directory=None, flush_interval=METRICS_FLUSH_SECONDS):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._metrics = []
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DURATION_BUCKETS):
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def snapshot(self):
+        return {metric.name: metric.snapshot() for metric in self._metrics}
+
+    def _snapshot_path(self, pid):
+        return os.path.join(self.directory, f"metrics_{pid}.json")
+
+    def flush(self):
+        """Write this process's snapshot to the shared directory"""
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, self._snapshot_path(os.getpid()))
+
+    def start(self):
+        """Start flushing snapshots in the background (after gunicorn's fork)"""
+        if not self.directory:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="metrics-flusher", daemon=True)
+                self._thread.start()
+                atexit.register(self._remove_snapshot, os.getpid())
+
+    def _remove_snapshot(self, pid):
+        try:
+            os.remove(self._snapshot_path(pid))
+        except OSError:
+            pass
+
+    def _run(self):
+        while True:
+            try:
+                self.flush()
+            except Exception:
+                pass
+            time.sleep(self.flush_interval)
+
+    def _other_snapshots(self):
+        if not self.directory:
+            return []
+        snapshots = []
+        for path in glob.glob(os.path.join(self.directory, 'metrics_*.json')):
+            try:
+                pid = int(os.path.basename(path)[len('metrics_'):-len('.json')])
+            except ValueError:
+                continue
+            if pid == os.getpid():
+                continue
+            if not _pid_alive(pid):
+                # Left behind by a worker that exited without cleaning up
+                self._remove_snapshot(pid)
+                continue
+            try:
+                with open(path, 'r') as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    def render(self):
+        """Metrics of all processes in the Prometheus text exposition format"""
+        snapshots = [self.snapshot()] + self._other_snapshots()
+        lines = []
+        for metric in self._metrics:
+            totals = {}
+            for snapshot in snapshots:
+                for key, value in snapshot.get(metric.name, []):
+                    key = tuple(key)
+                    if isinstance(value, list):
+                        current = totals.get(key, [0] * len(value))
+                        totals[key] = [a + b for a, b in zip(current, value)]
+                    else:
+                        totals[key] = totals.get(key, 0) + value
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for key, value in sorted(totals.items()):
+                labels = dict(zip(metric.labelnames, key))
+                if metric.type == 'histogram':
+                    # Bucket counts are cumulative already; +Inf is the total count
+                    for bound, count in zip(metric.buckets + (math.inf,), value[:-2] + [value[-1]]):
+                        le = '+Inf' if bound == math.inf else _format_value(bound)
+                        lines.append(f"{metric.name}_bucket{_format_labels(dict(labels, le=le))} {count}")
+                    lines.append(f"{metric.name}_sum{_format_labels(labels)} {_format_value(value[-2])}")
+                    lines.append(f"{metric.name}_count{_format_labels(labels)} {value[-1]}")
+                else:
+                    lines.append(f"{metric.name}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = []
+    for name, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+registry = MetricsRegistry(None if METRICS_DIR == 'off' else METRICS_DIR)
+
+# Pipeline metrics, updated by the utils modules and the app
+STAGE_SECONDS = registry.histogram(
+    'videodub_stage_duration_seconds', 'Wall-clock time of pipeline stages', ['stage'])
+STAGE_ERRORS = registry.counter(
+    'videodub_stage_errors_total', 'Pipeline stages that did not complete, by job outcome', ['stage', 'status'])
+JOB_SECONDS = registry.histogram(
+    'videodub_job_duration_seconds', 'Run time of finished jobs', ['kind'])
+JOBS_FINISHED = registry.counter(
+    'videodub_jobs_finished_total', 'Finished jobs by outcome', ['kind', 'status'])
+JOBS_IN_FLIGHT = registry.gauge(
+    'videodub_jobs_in_flight', 'Jobs queued or running', ['kind', 'status'])
+CUES_TRANSLATED = registry.counter(
+    'videodub_cues_translated_total', 'Texts sent to the translation engine', ['engine'])
+TRANSLATION_CACHE_LOOKUPS = registry.counter(
+    'videodub_translation_cache_lookups_total', 'Translation cache lookups', ['result'])
+TTS_CALLS = registry.counter(
+    'videodub_tts_calls_total', 'Text-to-speech requests, including retries', ['engine', 'result'])
+TTS_CACHE_LOOKUPS = registry.counter(
+    'videodub_tts_cache_lookups_total', 'Synthesized clip cache lookups', ['result'])
+BYTES_PROCESSED = registry.counter(
+    'videodub_bytes_processed_total', 'Bytes received, decoded or written by the pipeline', ['kind'])
+
+
+def start_span(trace, stage):
+    """Open a span for a stage in a job trace"""
+    trace.append({'stage': stage, 'start': time.time(), 'end': None, 'seconds': None, 'status': 'running'})
+
+
+def end_span(trace, stage, status='completed'):
+    """
+    Close the open span of a stage and record its duration
+
+    Args:
+        trace: List of span dicts of a job
+        stage: Stage name
+        status: 'completed', or the job outcome when the stage was cut short
+
+    Returns:
+        dict: The closed span, or None if the stage had no open span
+    """
+    for span in reversed(trace):
+        if span['stage'] == stage and span['end'] is None:
+            span['end'] = time.time()
+            span['seconds'] = round(span['end'] - span['start'], 3)
+            span['status'] = status
+            if status == 'completed':
+                STAGE_SECONDS.observe(span['seconds'], stage=stage)
+            else:
+                STAGE_ERRORS.inc(stage=stage, status=status)
+            return span
+    return None
+
+
+def close_open_spans(trace, status):
+    """Close every span still open when a job finishes"""
+    for span in list(trace):
+        if span['end'] is None:
+            end_span(trace, span['stage'], status)
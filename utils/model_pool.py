@@ -0,0 +1,101 @@
+import threading
+from collections import OrderedDict
+
+# Approximate resident memory of faster-whisper models with int8 weights (MB)
+MODEL_MEMORY_MB = {
+    'tiny': 150,
+    'base': 250,
+    'small': 600,
+    'medium': 1600,
+    'large': 3200,
+    'large-v1': 3200,
+    'large-v2': 3200,
+    'large-v3': 3200,
+    'distil-large-v3': 1800,
+}
+
+# Weight size relative to int8
+COMPUTE_TYPE_FACTOR = {
+    'int8': 1,
+    'int8_float32': 1,
+    'int8_float16': 1,
+    'float16': 2,
+    'float32': 4,
+}
+
+
+def estimate_model_memory_mb(model_size, compute_type):
+    """Rough memory estimate used for the pool's memory budget"""
+    base = MODEL_MEMORY_MB.get(model_size, MODEL_MEMORY_MB['large'])
+    return base * COMPUTE_TYPE_FACTOR.get(compute_type, 1)
+
+
+class ModelPool:
+    """
+    Thread-safe registry of loaded models keyed by (model_size, compute_type)
+
+    Several models stay resident as long as their estimated memory fits the
+    budget; beyond that the least recently used ones are dropped. A model
+    that is evicted while a worker is still using it stays alive until that
+    worker releases its reference.
+
+    Args:
+        loader: Callable loader(model_size, compute_type) returning a model
+        memory_budget_mb: Total estimated memory allowed for resident models
+    """
+
+    def __init__(self, loader, memory_budget_mb):
+        self.loader = loader
+        self.memory_budget_mb = memory_budget_mb
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self.loads = 0
+        self.evictions = 0
+
+    def get(self, model_size, compute_type):
+        """
+        Get a model, loading it on first use
+
+        Concurrent requests for the same model wait for a single load;
+        requests for other models are not blocked by it.
+        """
+        key = (model_size, compute_type)
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key]
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    return self._models[key]
+            model = self.loader(model_size, compute_type)
+            with self._lock:
+                self._models[key] = model
+                self.loads += 1
+                self._evict(keep=key)
+            return model
+
+    def _evict(self, keep):
+        while self.resident_mb() > self.memory_budget_mb:
+            victim = next((key for key in self._models if key != keep), None)
+            if victim is None:
+                break
+            del self._models[victim]
+            self.evictions += 1
+
+    def resident_mb(self):
+        return sum(estimate_model_memory_mb(*key) for key in self._models)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'resident': [f"{size}/{compute_type}" for size, compute_type in self._models],
+                'resident_mb': self.resident_mb(),
+                'memory_budget_mb': self.memory_budget_mb,
+                'loads': self.loads,
+                'evictions': self.evictions,
+            }
@@ -0,0 +1,390 @@
+import copy
+import glob
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+# Prefix of the per-session working directories, used to find orphans
+TEMP_DIR_PREFIX = 'videodub_session_'
+
+
+def make_temp_dir():
+    """Create a per-session working directory the reaper can recognise"""
+    return tempfile.mkdtemp(prefix=TEMP_DIR_PREFIX)
+
+
+class SessionStore:
+    """
+    Interface for storing session data and job records
+
+    Session data is a JSON-serialisable dict; job records are the dicts
+    produced by Job.to_dict(). Implementations must be safe to use from
+    several threads.
+    """
+
+    def get(self, session_id):
+        """Return the session dict, or None if it does not exist"""
+        raise NotImplementedError
+
+    def save(self, session_id, data):
+        """Create or replace a session"""
+        raise NotImplementedError
+
+    def update(self, session_id, func):
+        """
+        Atomically apply func(data) to a session and save the result
+
+        Returns:
+            dict: The updated data, or None if the session does not exist
+        """
+        raise NotImplementedError
+
+    def delete(self, session_id):
+        """Remove a session and return its last data (or None)"""
+        raise NotImplementedError
+
+    def expired(self, ttl):
+        """Return [(session_id, data)] for sessions untouched for ttl seconds"""
+        raise NotImplementedError
+
+    def all_sessions(self):
+        """Return [(session_id, data)] for every stored session"""
+        raise NotImplementedError
+
+    def save_job(self, record, owner):
+        """Create or replace a job record"""
+        raise NotImplementedError
+
+    def get_job(self, job_id):
+        """Return (record, owner) or (None, None)"""
+        raise NotImplementedError
+
+    def request_cancel(self, job_id):
+        """Flag a job for cancellation by whichever process runs it"""
+        raise NotImplementedError
+
+    def cancel_requested(self, job_id):
+        raise NotImplementedError
+
+    def delete_jobs_before(self, timestamp):
+        """Drop job records (and their events) not updated since timestamp"""
+        raise NotImplementedError
+
+    def add_event(self, job_id, event):
+        """Append an event to a job's event log and return its id"""
+        raise NotImplementedError
+
+    def get_events(self, job_id, after_id=0):
+        """Return [(event_id, event)] logged for a job after after_id, oldest first"""
+        raise NotImplementedError
+
+
+class MemorySessionStore(SessionStore):
+    """In-process store; only suitable for a single worker process"""
+
+    def __init__(self):
+        self._sessions = {}
+        self._jobs = {}
+        self._events = {}
+        self._event_id = 0
+        self._lock = threading.RLock()
+
+    def get(self, session_id):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            return copy.deepcopy(entry[0]) if entry else None
+
+    def save(self, session_id, data):
+        with self._lock:
+            self._sessions[session_id] = (copy.deepcopy(data), time.time())
+
+    def update(self, session_id, func):
+        with self._lock:
+            data = self.get(session_id)
+            if data is None:
+                return None
+            func(data)
+            self.save(session_id, data)
+            return data
+
+    def delete(self, session_id):
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            return entry[0] if entry else None
+
+    def expired(self, ttl):
+        cutoff = time.time() - ttl
+        with self._lock:
+            return [(session_id, copy.deepcopy(data))
+                    for session_id, (data, updated_at) in self._sessions.items() if updated_at < cutoff]
+
+    def all_sessions(self):
+        with self._lock:
+            return [(session_id, copy.deepcopy(data)) for session_id, (data, _) in self._sessions.items()]
+
+    def save_job(self, record, owner):
+        with self._lock:
+            cancel = self._jobs.get(record['id'], ({}, None, False, 0))[2]
+            self._jobs[record['id']] = (copy.deepcopy(record), owner, cancel, time.time())
+
+    def get_job(self, job_id):
+        with self._lock:
+            entry = self._jobs.get(job_id)
+            if entry is None:
+                return None, None
+            record = copy.deepcopy(entry[0])
+            record['updated_at'] = entry[3]
+            return record, entry[1]
+
+    def request_cancel(self, job_id):
+        with self._lock:
+            if job_id in self._jobs:
+                record, owner, _, updated_at = self._jobs[job_id]
+                self._jobs[job_id] = (record, owner, True, updated_at)
+
+    def cancel_requested(self, job_id):
+        with self._lock:
+            entry = self._jobs.get(job_id)
+            return bool(entry and entry[2])
+
+    def delete_jobs_before(self, timestamp):
+        with self._lock:
+            for job_id in [job_id for job_id, entry in self._jobs.items() if entry[3] < timestamp]:
+                del self._jobs[job_id]
+                self._events.pop(job_id, None)
+
+    def add_event(self, job_id, event):
+        with self._lock:
+            self._event_id += 1
+            self._events.setdefault(job_id, []).append((self._event_id, copy.deepcopy(event)))
+            return self._event_id
+
+    def get_events(self, job_id, after_id=0):
+        with self._lock:
+            return [(event_id, copy.deepcopy(event))
+                    for event_id, event in self._events.get(job_id, ()) if event_id > after_id]
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    SQLite-backed store shared by every worker process on the host
+
+    Read-modify-write updates run inside BEGIN IMMEDIATE transactions, so
+    SQLite's file lock serialises concurrent writers across processes.
+
+    Args:
+        db_path: Path of the SQLite database file
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, owner TEXT, record TEXT NOT NULL,"
+            " cancel_requested INTEGER NOT NULL DEFAULT 0, updated_at REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS job_events ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, job_id TEXT NOT NULL, data TEXT NOT NULL,"
+            " created_at REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated_at);"
+            "CREATE INDEX IF NOT EXISTS job_events_job ON job_events (job_id, id);"
+            "CREATE INDEX IF NOT EXISTS jobs_updated ON jobs (updated_at);"
+        )
+
+    def _conn(self):
+        # One connection per thread; isolation_level=None so transactions are explicit
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def get(self, session_id):
+        row = self._conn().execute("SELECT data FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, session_id, data):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO sessions (id, data, updated_at) VALUES (?, ?, ?)",
+            (session_id, json.dumps(data), time.time())
+        )
+
+    def update(self, session_id, func):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT data FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            data = json.loads(row[0])
+            func(data)
+            conn.execute("UPDATE sessions SET data = ?, updated_at = ? WHERE id = ?",
+                         (json.dumps(data), time.time(), session_id))
+            conn.execute("COMMIT")
+            return data
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete(self, session_id):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT data FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return json.loads(row[0]) if row else None
+
+    def expired(self, ttl):
+        rows = self._conn().execute(
+            "SELECT id, data FROM sessions WHERE updated_at < ?", (time.time() - ttl,)
+        ).fetchall()
+        return [(session_id, json.loads(data)) for session_id, data in rows]
+
+    def all_sessions(self):
+        rows = self._conn().execute("SELECT id, data FROM sessions").fetchall()
+        return [(session_id, json.loads(data)) for session_id, data in rows]
+
+    def save_job(self, record, owner):
+        self._conn().execute(
+            "INSERT INTO jobs (id, owner, record, updated_at) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT(id) DO UPDATE SET record = excluded.record, updated_at = excluded.updated_at",
+            (record['id'], owner, json.dumps(record), time.time())
+        )
+
+    def get_job(self, job_id):
+        row = self._conn().execute(
+            "SELECT record, owner, updated_at FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None, None
+        record = json.loads(row[0])
+        record['updated_at'] = row[2]
+        return record, row[1]
+
+    def request_cancel(self, job_id):
+        self._conn().execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,))
+
+    def cancel_requested(self, job_id):
+        row = self._conn().execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def delete_jobs_before(self, timestamp):
+        conn = self._conn()
+        conn.execute("DELETE FROM jobs WHERE updated_at < ?", (timestamp,))
+        conn.execute("DELETE FROM job_events WHERE created_at < ?", (timestamp,))
+
+    def add_event(self, job_id, event):
+        cursor = self._conn().execute(
+            "INSERT INTO job_events (job_id, data, created_at) VALUES (?, ?, ?)",
+            (job_id, json.dumps(event), time.time())
+        )
+        return cursor.lastrowid
+
+    def get_events(self, job_id, after_id=0):
+        rows = self._conn().execute(
+            "SELECT id, data FROM job_events WHERE job_id = ? AND id > ? ORDER BY id", (job_id, after_id)
+        ).fetchall()
+        return [(event_id, json.loads(data)) for event_id, data in rows]
+
+
+def create_session_store(kind=None, db_path=None):
+    """
+    Create the configured session store
+
+    Args:
+        kind: 'sqlite' or 'memory' (defaults to the SESSION_STORE environment variable, then 'sqlite')
+        db_path: SQLite database path (defaults to SESSION_DB_PATH)
+
+    Returns:
+        SessionStore: The store
+    """
+    kind = kind or os.environ.get('SESSION_STORE', 'sqlite')
+    if kind == 'memory':
+        return MemorySessionStore()
+    if kind == 'sqlite':
+        db_path = db_path or os.environ.get(
+            'SESSION_DB_PATH', os.path.join(tempfile.gettempdir(), 'videodub_sessions.sqlite3')
+        )
+        return SQLiteSessionStore(db_path)
+    raise ValueError(f"Unknown session store: {kind}")
+
+
+class SessionReaper:
+    """
+    Background thread that expires idle sessions and their temp directories
+
+    Args:
+        store: SessionStore to sweep
+        ttl: Seconds of inactivity after which a session expires
+        interval: Seconds between sweeps
+        is_busy: Callable is_busy(data) returning True while a session must be kept
+        on_expire: Optional callable on_expire(session_id, data) run for every
+            removed session (e.g. to release what it referenced)
+    """
+
+    def __init__(self, store, ttl, interval=600, is_busy=None, on_expire=None):
+        self.store = store
+        self.ttl = ttl
+        self.interval = interval
+        self.is_busy = is_busy or (lambda data: False)
+        self.on_expire = on_expire
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="session-reaper", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.sweep()
+            except Exception:
+                pass
+
+    def sweep(self):
+        """Expire idle sessions, old job records and orphaned temp dirs"""
+        removed = 0
+        for session_id, data in self.store.expired(self.ttl):
+            if self.is_busy(data):
+                continue
+            self.store.delete(session_id)
+            remove_temp_dir(data.get('temp_dir'))
+            if self.on_expire is not None:
+                self.on_expire(session_id, data)
+            removed += 1
+        self.store.delete_jobs_before(time.time() - self.ttl)
+
+        # Directories whose session vanished (e.g. a worker crashed mid-upload)
+        referenced = {data.get('temp_dir') for _, data in self.store.all_sessions()}
+        cutoff = time.time() - self.ttl
+        for path in glob.glob(os.path.join(tempfile.gettempdir(), TEMP_DIR_PREFIX + '*')):
+            if path in referenced or not os.path.isdir(path):
+                continue
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    remove_temp_dir(path)
+            except OSError:
+                continue
+        return removed
+
+
+def remove_temp_dir(path):
+    if path and os.path.exists(path):
+        shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,94 @@
+import numpy as np
+
+# Analysis frame and search tolerance for WSOLA; 40 ms frames keep speech
+# pitch periods intact and +-10 ms is enough to find a matching waveform
+FRAME_MS = 40
+TOLERANCE_MS = 10
+
+_windows = {}
+
+
+def _hann(length):
+    # Periodic Hann window: copies overlapped at half its length sum to one
+    window = _windows.get(length)
+    if window is None:
+        window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(length) / length)).astype(np.float32)
+        _windows[length] = window
+    return window
+
+
+def wsola(samples, rate, sample_rate, frame_ms=FRAME_MS, tolerance_ms=TOLERANCE_MS):
+    """
+    Change the duration of audio without changing its pitch (WSOLA)
+
+    Waveform-similarity overlap-add: output frames are taken from the input
+    at the ideal position for the rate, shifted by up to tolerance_ms to the
+    offset whose waveform best continues the previous frame, and overlap-added
+    with a Hann window. The search is one cross-correlation per frame.
+
+    Args:
+        samples: Mono int16 or float samples
+        rate: Speed factor; 2.0 halves the duration, 0.5 doubles it
+        sample_rate: Sample rate of the samples
+        frame_ms: Frame length in milliseconds
+        tolerance_ms: Search range around the ideal frame position
+
+    Returns:
+        numpy.ndarray: Stretched samples with the input dtype
+    """
+    if rate <= 0:
+        raise ValueError("Stretch rate must be positive")
+    if len(samples) == 0 or rate == 1:
+        return samples.copy()
+
+    frame = max(2, int(sample_rate * frame_ms / 1000) // 2 * 2)
+    half = frame // 2
+    tolerance = int(sample_rate * tolerance_ms / 1000)
+    hop_in = half * rate
+    out_length = int(round(len(samples) / rate))
+    n_frames = out_length // half + 2
+
+    # Pad so every frame and search window stays inside the buffer; the
+    # extra half frame in front lets the first output samples be fully windowed
+    head = tolerance + half
+    tail = int(n_frames * hop_in) + frame + 2 * tolerance - len(samples) + 1
+    x = np.concatenate([
+        np.zeros(head, dtype=np.float32),
+        samples.astype(np.float32),
+        np.zeros(max(0, tail), dtype=np.float32)
+    ])
+    window = _hann(frame)
+    out = np.zeros(n_frames * half + frame, dtype=np.float32)
+
+    position = 0
+    for k in range(n_frames):
+        ideal = int(k * hop_in)
+        if k > 0:
+            # Natural continuation of the previous frame over the overlap
+            reference = x[position + half + tolerance:position + frame + tolerance]
+            region = x[ideal:ideal + 2 * tolerance + half]
+            position = ideal - tolerance + int(np.argmax(np.correlate(region, reference, 'valid')))
+        out[k * half:k * half + frame] += x[position + tolerance:position + tolerance + frame] * window
+
+    result = out[half:half + out_length]
+    if np.issubdtype(samples.dtype, np.integer):
+        info = np.iinfo(samples.dtype)
+        return np.clip(np.round(result), info.min, info.max).astype(samples.dtype)
+    return result.astype(samples.dtype)
+
+
+def stretch_rate(clip_length, slot_length, max_rate):
+    """
+    Speed factor that fits a clip into its slot, capped at max_rate
+
+    Args:
+        clip_length: Clip length in samples
+        slot_length: Time available for the clip in samples
+        max_rate: Largest speed-up allowed; beyond it the clip runs over its slot
+
+    Returns:
+        float: 1.0 when the clip already fits, otherwise the speed factor
+    """
+    if slot_length <= 0 or clip_length <= slot_length:
+        return 1.0
+    return min(clip_length / slot_length, max_rate)
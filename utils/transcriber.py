@@ -1,49 +1,152 @@
-from faster_whisper import WhisperModel
 import os
+import threading
 
-# Global model cache to avoid reloading
-_model_cache = None
+from utils.model_pool import ModelPool
 
-def get_whisper_model():
-    """Get or create cached Whisper model"""
-    global _model_cache
-    if _model_cache is None:
-        # Use "tiny" model for faster processing and lower memory usage on free tier
-        # Options: tiny, base, small, medium, large
-        model_size = os.environ.get('WHISPER_MODEL', 'tiny')
-        _model_cache = WhisperModel(model_size, device="cpu", compute_type="int8")
-    return _model_cache
+# Use "tiny" model for faster processing and lower memory usage on free tier
+# Options: tiny, base, small, medium, large
+WHISPER_MODEL = os.environ.get('WHISPER_MODEL', 'tiny')
+WHISPER_COMPUTE_TYPE = os.environ.get('WHISPER_COMPUTE_TYPE', 'int8')
+# 0 lets CTranslate2 pick the thread count
+WHISPER_CPU_THREADS = int(os.environ.get('WHISPER_CPU_THREADS', 0))
+WHISPER_NUM_WORKERS = int(os.environ.get('WHISPER_NUM_WORKERS', 1))
 
-def transcribe_audio(audio_path):
+# Models loaded at warmup, e.g. "tiny,small" or "small:float32"
+WHISPER_PRELOAD = os.environ.get('WHISPER_PRELOAD', WHISPER_MODEL)
+# Estimated memory the resident models may use together
+WHISPER_MEMORY_BUDGET_MB = int(os.environ.get('WHISPER_MEMORY_BUDGET_MB', 2048))
+
+# Decoding settings optimized for speed
+TRANSCRIBE_OPTIONS = {
+    'beam_size': 1,  # Faster, less accurate
+    'best_of': 1,
+    'temperature': 0
+}
+
+def load_whisper_model(model_size=WHISPER_MODEL, compute_type=WHISPER_COMPUTE_TYPE,
+                       cpu_threads=WHISPER_CPU_THREADS, num_workers=WHISPER_NUM_WORKERS):
+    """Load a Whisper model on the CPU"""
+    # Imported here: faster-whisper pulls in CTranslate2 and tokenizers, which
+    # only the first model load needs to pay for
+    from faster_whisper import WhisperModel
+    return WhisperModel(model_size, device="cpu", compute_type=compute_type,
+                        cpu_threads=cpu_threads, num_workers=num_workers)
+
+# Shared pool of resident models
+model_pool = ModelPool(load_whisper_model, WHISPER_MEMORY_BUDGET_MB)
+
+def parse_model_specs(specs):
     """
-    Transcribe audio file using faster-whisper model
+    Parse a comma separated model list such as "tiny,small:float32"
+    
+    Returns:
+        list: (model_size, compute_type) tuples
+    """
+    models = []
+    for spec in specs.split(','):
+        spec = spec.strip()
+        if not spec:
+            continue
+        model_size, _, compute_type = spec.partition(':')
+        models.append((model_size, compute_type or WHISPER_COMPUTE_TYPE))
+    return models
+
+def allowed_model_sizes():
+    """Model sizes clients may request: the default plus the preloaded ones"""
+    return {WHISPER_MODEL} | {model_size for model_size, _ in parse_model_specs(WHISPER_PRELOAD)}
+
+def get_whisper_model(model_size=None, compute_type=None):
+    """Get a resident Whisper model from the pool, loading it if needed"""
+    return model_pool.get(model_size or WHISPER_MODEL, compute_type or WHISPER_COMPUTE_TYPE)
+
+_warmup_thread = None
+_warmup_error = None
+
+def start_warmup():
+    """Preload the WHISPER_PRELOAD models in the background (only once)"""
+    global _warmup_thread
+    if _warmup_thread is None:
+        def warmup():
+            global _warmup_error
+            try:
+                for model_size, compute_type in parse_model_specs(WHISPER_PRELOAD):
+                    model_pool.get(model_size, compute_type)
+            except Exception as e:
+                _warmup_error = str(e)
+        _warmup_thread = threading.Thread(target=warmup, name="whisper-warmup", daemon=True)
+        _warmup_thread.start()
+
+def warmup_status():
+    """
+    Report whether the preloaded models are ready
+    
+    Returns:
+        dict: {'ready': bool, 'error': str or None, 'models': pool stats}
+    """
+    ready = (_warmup_thread is not None and not _warmup_thread.is_alive() and _warmup_error is None)
+    return {'ready': ready, 'error': _warmup_error, 'models': model_pool.stats()}
+
+def report_segment_progress(segments, duration, progress):
+    """
+    Wrap a segment iterator so progress(seconds_done, duration) is called per segment
+    
+    Args:
+        segments: Iterable of segments with an end time in seconds
+        duration: Total audio duration in seconds (no progress is reported if unknown)
+        progress: Callback progress(seconds_done, duration), or None
+    
+    Yields:
+        The segments unchanged
+    """
+    if not duration:
+        progress = None
+    for segment in segments:
+        if progress is not None:
+            progress(min(segment.end, duration), duration)
+        yield segment
+    if progress is not None:
+        progress(duration, duration)
+
+def transcribe_audio_stream(audio_path, model_size=None, progress=None):
+    """
+    Start transcribing an audio file, yielding segments as Whisper emits them
     
     Args:
         audio_path: Path to audio file to transcribe
+        model_size: Whisper model size (defaults to WHISPER_MODEL)
+        progress: Optional callback progress(seconds_transcribed, duration)
         
     Returns:
-        tuple: (detected_language, list_of_segments)
+        tuple: (detected_language, segment_generator)
     """
     try:
         # Get cached model
-        model = get_whisper_model()
+        model = get_whisper_model(model_size)
         
-        # Transcribe the audio with optimized settings for speed
-        segments, info = model.transcribe(
-            audio_path, 
-            beam_size=1,  # Faster, less accurate
-            best_of=1,
-            temperature=0
-        )
+        # Transcribe the audio with optimized settings for speed; faster-whisper
+        # detects the language up front and decodes lazily while iterating
+        segments, info = model.transcribe(audio_path, **TRANSCRIBE_OPTIONS)
         
-        # Get detected language
-        detected_language = info.language
+        return info.language, report_segment_progress(segments, info.duration, progress)
         
-        # Convert generator to list
-        segments_list = list(segments)
-        
-        return detected_language, segments_list
+    except Exception as e:
+        raise Exception(f"Error during transcription: {str(e)}")
+
+def transcribe_audio(audio_path, model_size=None):
+    """
+    Transcribe audio file using faster-whisper model
+    
+    Args:
+        audio_path: Path to audio file to transcribe
+        model_size: Whisper model size (defaults to WHISPER_MODEL)
         
+    Returns:
+        tuple: (detected_language, list_of_segments)
+    """
+    detected_language, segments = transcribe_audio_stream(audio_path, model_size)
+    try:
+        # Convert generator to list
+        return detected_language, list(segments)
     except Exception as e:
         raise Exception(f"Error during transcription: {str(e)}")
 
@@ -0,0 +1,88 @@
+import sqlite3
+import threading
+
+
+class TranslationCache:
+    """
+    Persistent translation cache keyed by (engine, source, target, text)
+
+    Backed by SQLite in WAL mode so several worker processes can share it.
+
+    Args:
+        db_path: Path of the SQLite database file
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                " engine TEXT NOT NULL, source TEXT NOT NULL, target TEXT NOT NULL,"
+                " text TEXT NOT NULL, translation TEXT NOT NULL,"
+                " PRIMARY KEY (engine, source, target, text))"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def get_many(self, engine_name, source_lang, target_lang, texts):
+        """
+        Look up cached translations
+
+        Returns:
+            dict: Mapping of text to translation for the texts that were cached
+        """
+        found = {}
+        texts = list(texts)
+        conn = self._connect()
+        try:
+            # Stay below SQLite's bound-parameter limit
+            for i in range(0, len(texts), 500):
+                chunk = texts[i:i + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = conn.execute(
+                    f"SELECT text, translation FROM translations"
+                    f" WHERE engine = ? AND source = ? AND target = ? AND text IN ({placeholders})",
+                    [engine_name, source_lang, target_lang] + chunk
+                )
+                found.update(rows)
+        finally:
+            conn.close()
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(texts) - len(found)
+        return found
+
+    def put_many(self, engine_name, source_lang, target_lang, translations):
+        """
+        Store translations
+
+        Args:
+            translations: Mapping of source text to translated text
+        """
+        if not translations:
+            return
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO translations (engine, source, target, text, translation)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    [(engine_name, source_lang, target_lang, text, translation)
+                     for text, translation in translations.items()]
+                )
+        finally:
+            conn.close()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else None,
+            }
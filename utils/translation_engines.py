@@ -0,0 +1,145 @@
+import os
+import re
+
+# Marker put in front of every packed line, e.g. "[12] Hello there"
+_MARKER_RE = re.compile(r'^\s*\[(\d+)\]\s?(.*)$')
+
+
+def pack_batch(texts):
+    """
+    Pack several single-line texts into one request body
+
+    Args:
+        texts: List of texts without newlines
+
+    Returns:
+        str: Texts on separate lines, each prefixed with its position
+    """
+    return "\n".join(f"[{i}] {text}" for i, text in enumerate(texts))
+
+
+def unpack_batch(packed, count):
+    """
+    Split a translated batch back into its texts
+
+    Args:
+        packed: Translated body produced from pack_batch()
+        count: Number of texts that were packed
+
+    Returns:
+        list: Translated texts in order, or None if the markers were mangled
+    """
+    # Markers must come back once each and in order, and every line must
+    # carry one; anything else may pair a translation with the wrong text
+    positions, results = [], []
+    for line in packed.splitlines():
+        if not line.strip():
+            continue
+        match = _MARKER_RE.match(line)
+        if not match:
+            return None
+        positions.append(int(match.group(1)))
+        results.append(match.group(2).strip())
+    if positions != list(range(count)):
+        return None
+    return results
+
+
+class TranslationEngine:
+    """
+    Base class for translation backends
+
+    Subclasses implement translate(); translate_batch() packs several texts
+    into one translate() call and falls back to one call per text when the
+    markers do not survive the round trip.
+    """
+
+    name = 'base'
+    # Remote engines are throttled by the shared rate limiter
+    remote = False
+    # Upper bound on the packed request size in characters
+    max_batch_chars = 4000
+
+    def translate(self, text, target_lang, source_lang):
+        """
+        Translate one piece of text
+
+        Args:
+            text: Text to translate
+            target_lang: Target language code
+            source_lang: Source language code
+
+        Returns:
+            str: Translated text
+        """
+        raise NotImplementedError
+
+    def translate_batch(self, texts, target_lang, source_lang):
+        """
+        Translate several single-line texts with one request
+
+        Returns:
+            list: Translated texts in the same order
+        """
+        if len(texts) == 1:
+            return [self.translate(texts[0], target_lang, source_lang)]
+        packed = self.translate(pack_batch(texts), target_lang, source_lang)
+        unpacked = unpack_batch(packed, len(texts))
+        if unpacked is None:
+            return [self.translate(text, target_lang, source_lang) for text in texts]
+        return unpacked
+
+
+class TranslateLibEngine(TranslationEngine):
+    """Online translation through the `translate` package (MyMemory by default)"""
+
+    name = 'translate'
+    remote = True
+    # MyMemory rejects queries longer than 500 bytes
+    max_batch_chars = 450
+
+    def __init__(self, provider=None, **provider_kwargs):
+        self.provider = provider
+        self.provider_kwargs = provider_kwargs
+
+    def translate(self, text, target_lang, source_lang):
+        from translate import Translator
+        translator = Translator(to_lang=target_lang, from_lang=source_lang,
+                                provider=self.provider, **self.provider_kwargs)
+        return translator.translate(text)
+
+
+class EchoTranslationEngine(TranslationEngine):
+    """
+    Offline stand-in that tags every line with the target language
+
+    Output is deterministic, which makes it suitable for tests and benchmarks.
+    """
+
+    name = 'echo'
+
+    def translate(self, text, target_lang, source_lang):
+        return "\n".join(f"{line} ({target_lang})" for line in text.split("\n"))
+
+
+TRANSLATION_ENGINES = {
+    TranslateLibEngine.name: TranslateLibEngine,
+    EchoTranslationEngine.name: EchoTranslationEngine,
+}
+
+
+def get_translation_engine(name=None, **kwargs):
+    """
+    Create a translation engine by name
+
+    Args:
+        name: Engine name (defaults to the TRANSLATION_ENGINE environment variable, then 'translate')
+        **kwargs: Extra arguments passed to the engine constructor
+
+    Returns:
+        TranslationEngine: The engine instance
+    """
+    name = name or os.environ.get('TRANSLATION_ENGINE', TranslateLibEngine.name)
+    if name not in TRANSLATION_ENGINES:
+        raise ValueError(f"Unknown translation engine: {name}")
+    return TRANSLATION_ENGINES[name](**kwargs)
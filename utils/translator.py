@@ -1,48 +1,260 @@
-import pysrt
-from translate import Translator
+import os
+import queue
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.cues import CueList
+from utils.metrics import CUES_TRANSLATED, TRANSLATION_CACHE_LOOKUPS
+from utils.rate_limiter import RateLimiter
+from utils.translation_cache import TranslationCache
+from utils.translation_engines import get_translation_engine
+
+# Concurrency and throttling for translation requests
+TRANSLATION_WORKERS = int(os.environ.get('TRANSLATION_WORKERS', 4))
+TRANSLATION_RATE_LIMIT = float(os.environ.get('TRANSLATION_RATE_LIMIT', 5))
+
+# Texts per request when translating subtitles while transcription is still running
+STREAM_BATCH_SIZE = int(os.environ.get('STREAM_BATCH_SIZE', 8))
+
+# Persistent cache shared by all jobs; TRANSLATION_CACHE_PATH=off disables it
+TRANSLATION_CACHE_PATH = os.environ.get(
+    'TRANSLATION_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'videodub_translations.sqlite3')
+)
+
+_rate_limiter = RateLimiter(TRANSLATION_RATE_LIMIT, burst=TRANSLATION_WORKERS)
+
+_translation_cache = None
+_translation_cache_lock = threading.Lock()
+
+def get_translation_cache():
+    """Get or create the shared translation cache (None when disabled)"""
+    global _translation_cache
+    # Each target language has a StreamingTranslator thread asking for it
+    with _translation_cache_lock:
+        if _translation_cache is None and TRANSLATION_CACHE_PATH != 'off':
+            _translation_cache = TranslationCache(TRANSLATION_CACHE_PATH)
+        return _translation_cache
 
 def translate_text(text, to_lang, from_lang="auto"):
     """
     Translate text from one language to another
-    
+
     Args:
         text: Text to translate
         to_lang: Target language code
         from_lang: Source language code (default: auto-detect)
-        
+
     Returns:
         str: Translated text
     """
     try:
-        translator = Translator(to_lang=to_lang, from_lang=from_lang)
-        translated_text = translator.translate(text)
-        return translated_text
+        return get_translation_engine().translate(text, to_lang, from_lang)
     except Exception as e:
         # If translation fails, return original text
         return text
 
-def translate_subtitles(input_srt_path, output_srt_path, target_lang, source_lang="auto"):
+def make_batches(texts, max_chars):
+    """
+    Group texts into batches whose packed size stays under max_chars
+
+    Multi-line texts are sent on their own since packing is line based.
+
+    Args:
+        texts: List of texts to group
+        max_chars: Size limit of one packed batch
+
+    Returns:
+        list: List of text lists
+    """
+    batches = []
+    current = []
+    current_chars = 0
+    for text in texts:
+        if "\n" in text:
+            batches.append([text])
+            continue
+        # Packed line is "[n] text" plus a newline separator
+        if current and current_chars + len(f"[{len(current)}] {text}\n") > max_chars:
+            batches.append(current)
+            current = []
+            current_chars = 0
+        current_chars += len(f"[{len(current)}] {text}\n")
+        current.append(text)
+    if current:
+        batches.append(current)
+    return batches
+
+def _translate_batch(engine, batch, target_lang, source_lang, rate_limiter):
+    if rate_limiter is not None:
+        rate_limiter.acquire()
+    try:
+        return dict(zip(batch, engine.translate_batch(batch, target_lang, source_lang)))
+    except Exception:
+        # Retry one by one so a single bad line doesn't lose the whole batch
+        results = {}
+        for text in batch:
+            if rate_limiter is not None:
+                rate_limiter.acquire()
+            try:
+                results[text] = engine.translate(text, target_lang, source_lang)
+            except Exception:
+                continue
+        return results
+
+def translate_texts(texts, target_lang, source_lang="auto", engine=None, cache=None,
+                    max_workers=TRANSLATION_WORKERS, progress=None, failed=None):
+    """
+    Translate many texts with deduplication, batching, caching and a worker pool
+
+    Args:
+        texts: List of texts to translate
+        target_lang: Target language code
+        source_lang: Source language code (default: auto-detect)
+        engine: TranslationEngine to use (defaults to the TRANSLATION_ENGINE setting)
+        cache: TranslationCache to use (defaults to the shared cache)
+        max_workers: Number of batches translated concurrently
+        progress: Optional callback progress(texts_done, texts_total) counting unique texts
+        failed: Optional set that receives the texts that could not be translated
+
+    Returns:
+        list: Translated texts in the same order; texts that fail to
+        translate are returned unchanged
+    """
+    engine = engine or get_translation_engine()
+    cache = cache if cache is not None else get_translation_cache()
+
+    unique_texts = list(dict.fromkeys(text for text in texts if text.strip()))
+
+    translations = {}
+    if cache is not None:
+        translations.update(cache.get_many(engine.name, source_lang, target_lang, unique_texts))
+
+    missing = [text for text in unique_texts if text not in translations]
+    if cache is not None:
+        TRANSLATION_CACHE_LOOKUPS.inc(len(unique_texts) - len(missing), result='hit')
+        TRANSLATION_CACHE_LOOKUPS.inc(len(missing), result='miss')
+    if progress is not None:
+        progress(len(translations), len(unique_texts))
+    if missing:
+        batches = make_batches(missing, engine.max_batch_chars)
+        rate_limiter = _rate_limiter if engine.remote else None
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            new_translations = {}
+            done = len(unique_texts) - len(missing)
+            for batch, result in zip(batches, executor.map(
+                lambda batch: _translate_batch(engine, batch, target_lang, source_lang, rate_limiter),
+                batches
+            )):
+                new_translations.update(result)
+                done += len(batch)
+                if progress is not None:
+                    progress(done, len(unique_texts))
+        CUES_TRANSLATED.inc(len(missing), engine=engine.name)
+        if cache is not None:
+            cache.put_many(engine.name, source_lang, target_lang, new_translations)
+        translations.update(new_translations)
+        if failed is not None:
+            failed.update(text for text in missing if text not in new_translations)
+
+    return [translations.get(text, text) for text in texts]
+
+class StreamingTranslator:
+    """
+    Translates texts in small batches on a background thread while more
+    texts are still arriving (e.g. from a streaming transcription)
+
+    Translations are delivered in submission order through on_translated.
+    Texts that fail to translate are delivered unchanged and counted in
+    fallbacks.
+
+    Args:
+        target_lang: Target language code
+        source_lang: Source language code
+        on_translated: Callback called as on_translated(position, translated_text)
+        batch_size: Maximum number of texts per translation call
+        engine: TranslationEngine to use (defaults to the TRANSLATION_ENGINE setting)
+        cache: TranslationCache to use (defaults to the shared cache)
+    """
+
+    def __init__(self, target_lang, source_lang, on_translated, batch_size=STREAM_BATCH_SIZE,
+                 engine=None, cache=None):
+        self.target_lang = target_lang
+        self.source_lang = source_lang
+        self.on_translated = on_translated
+        self.batch_size = max(1, batch_size)
+        self.engine = engine
+        self.cache = cache
+        self.error = None
+        self.fallbacks = 0
+        self._queue = queue.Queue()
+        self._count = 0
+        self._thread = threading.Thread(target=self._run, name="streaming-translator", daemon=True)
+        self._thread.start()
+
+    def add(self, text):
+        """Queue a text for translation"""
+        self._queue.put((self._count, text))
+        self._count += 1
+
+    def close(self):
+        """Translate whatever is still queued and wait for the worker to finish"""
+        self._queue.put(None)
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def _run(self):
+        done = False
+        while not done:
+            # Block for the first text, then take whatever else is already waiting
+            batch = []
+            item = self._queue.get()
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            done = item is None
+            if not batch or self.error is not None:
+                continue
+            try:
+                failed = set()
+                translated = translate_texts([text for _, text in batch], self.target_lang, self.source_lang,
+                                             engine=self.engine, cache=self.cache, max_workers=1, failed=failed)
+                self.fallbacks += sum(1 for _, text in batch if text in failed)
+                for (position, _), translated_text in zip(batch, translated):
+                    self.on_translated(position, translated_text)
+            except Exception as e:
+                self.error = e
+
+def translate_subtitles(input_srt_path, output_srt_path, target_lang, source_lang="auto", engine=None, cache=None,
+                        progress=None):
     """
     Translate an SRT subtitle file to target language
-    
+
     Args:
         input_srt_path: Path to input SRT file
         output_srt_path: Path where translated SRT file will be saved
         target_lang: Target language code
         source_lang: Source language code (default: auto-detect)
+        engine: TranslationEngine to use (defaults to the TRANSLATION_ENGINE setting)
+        cache: TranslationCache to use (defaults to the shared cache)
+        progress: Optional callback progress(texts_done, texts_total)
     """
     try:
-        # Load the subtitle file
-        subs = pysrt.open(input_srt_path, encoding='utf-8')
-        
-        # Translate each subtitle
-        for sub in subs:
-            original_text = sub.text
-            translated_text = translate_text(original_text, target_lang, source_lang)
-            sub.text = translated_text
-        
-        # Save the translated subtitles
-        subs.save(output_srt_path, encoding='utf-8')
-        
+        cues = CueList.read_srt(input_srt_path)
+
+        # Translate all subtitles together so identical lines are sent once
+        translated = translate_texts(cues.texts, target_lang, source_lang,
+                                     engine=engine, cache=cache, progress=progress)
+        for index, translated_text in enumerate(translated):
+            cues.set_text(index, translated_text)
+
+        cues.write(output_srt_path)
+
     except Exception as e:
         raise Exception(f"Error translating subtitles: {str(e)}")
@@ -0,0 +1,114 @@
+import io
+import os
+import zlib
+import numpy as np
+
+from utils.audio_timeline import DEFAULT_SAMPLE_RATE, segment_to_array
+
+
+class TTSEngine:
+    """
+    Base class for text-to-speech backends
+
+    Engines return mono int16 samples at self.sample_rate so the clips can be
+    mixed straight into an AudioTimeline.
+    """
+
+    name = 'base'
+    # Remote engines are throttled by the shared rate limiter
+    remote = False
+
+    def __init__(self, sample_rate=DEFAULT_SAMPLE_RATE):
+        self.sample_rate = sample_rate
+
+    @property
+    def cache_key(self):
+        """Identity of the engine and voice settings, used to key cached clips"""
+        return f"{self.name}:{self.sample_rate}"
+
+    def synthesize(self, text, language):
+        """
+        Convert text to speech
+
+        Args:
+            text: Text to speak
+            language: Language code for text-to-speech
+
+        Returns:
+            numpy.ndarray: int16 mono samples
+        """
+        raise NotImplementedError
+
+
+class GTTSEngine(TTSEngine):
+    """Google Text-to-Speech via gTTS; decodes the MP3 in memory"""
+
+    name = 'gtts'
+    remote = True
+
+    def __init__(self, sample_rate=DEFAULT_SAMPLE_RATE, tld='com'):
+        super().__init__(sample_rate)
+        self.tld = tld
+
+    @property
+    def cache_key(self):
+        return f"{self.name}:{self.tld}:{self.sample_rate}"
+
+    def synthesize(self, text, language):
+        from gtts import gTTS
+        from pydub import AudioSegment
+
+        mp3_data = io.BytesIO()
+        gTTS(text, lang=language, tld=self.tld).write_to_fp(mp3_data)
+        mp3_data.seek(0)
+        audio = AudioSegment.from_file(mp3_data, format='mp3')
+        return segment_to_array(audio, self.sample_rate)
+
+
+class ToneTTSEngine(TTSEngine):
+    """
+    Offline stand-in that emits a tone whose length is proportional to the text
+
+    Output is deterministic, which makes it suitable for tests and benchmarks.
+    """
+
+    name = 'tone'
+
+    def __init__(self, sample_rate=DEFAULT_SAMPLE_RATE, ms_per_char=60, min_ms=200):
+        super().__init__(sample_rate)
+        self.ms_per_char = ms_per_char
+        self.min_ms = min_ms
+
+    @property
+    def cache_key(self):
+        return f"{self.name}:{self.ms_per_char}:{self.min_ms}:{self.sample_rate}"
+
+    def synthesize(self, text, language):
+        duration_ms = max(self.min_ms, len(text) * self.ms_per_char)
+        # Derive the pitch from the text so different cues are distinguishable
+        frequency = 200 + zlib.crc32(f"{language}:{text}".encode('utf-8')) % 400
+        t = np.arange(int(self.sample_rate * duration_ms / 1000)) / self.sample_rate
+        return (np.sin(2 * np.pi * frequency * t) * 8000).astype(np.int16)
+
+
+TTS_ENGINES = {
+    GTTSEngine.name: GTTSEngine,
+    ToneTTSEngine.name: ToneTTSEngine,
+}
+
+
+def get_tts_engine(name=None, **kwargs):
+    """
+    Create a TTS engine by name
+
+    Args:
+        name: Engine name (defaults to the TTS_ENGINE environment variable, then 'gtts')
+        **kwargs: Extra arguments passed to the engine constructor
+
+    Returns:
+        TTSEngine: The engine instance
+    """
+    name = name or os.environ.get('TTS_ENGINE', GTTSEngine.name)
+    if name not in TTS_ENGINES:
+        raise ValueError(f"Unknown TTS engine: {name}")
+    return TTS_ENGINES[name](**kwargs)
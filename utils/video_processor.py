@@ -1,55 +1,363 @@
 import ffmpeg
 import os
-from moviepy.editor import VideoFileClip, AudioFileClip
+import shutil
+import subprocess
+import threading
+import numpy as np
 
-def extract_audio(video_path, output_audio_path):
+from utils.metrics import BYTES_PROCESSED
+
+def run_ffmpeg(stream, duration=None, progress=None):
+    """
+    Run an ffmpeg command, optionally reporting how far the output has got
+    
+    Progress is read from ffmpeg's machine-readable -progress output.
+    
+    Args:
+        stream: ffmpeg-python output stream
+        duration: Expected output duration in seconds (progress needs it)
+        progress: Optional callback progress(seconds_done, duration)
+    """
+    if progress is None or not duration:
+        ffmpeg.run(stream, overwrite_output=True, quiet=True)
+        return
+    
+    stream = stream.global_args('-nostdin', '-nostats', '-progress', 'pipe:1')
+    process = ffmpeg.run_async(stream, pipe_stdout=True, pipe_stderr=True, overwrite_output=True)
+    # Drain stderr on the side so a chatty ffmpeg cannot block on a full pipe
+    stderr = []
+    reader = threading.Thread(target=lambda: stderr.append(process.stderr.read()), daemon=True)
+    reader.start()
+    seconds = reported = None
+    try:
+        for line in process.stdout:
+            key, _, value = line.decode('utf-8', 'replace').strip().partition('=')
+            # Both keys are in microseconds despite the name of the older one
+            if key in ('out_time_us', 'out_time_ms') and value.isdigit():
+                seconds = min(int(value) / 1000000, duration)
+            # A progress= line closes each block; completion is reported once
+            # ffmpeg has exited successfully
+            elif key == 'progress' and value != 'end' and seconds is not None and seconds != reported:
+                reported = seconds
+                if seconds < duration:
+                    progress(seconds, duration)
+    except BaseException:
+        # The callback raised (e.g. the job was cancelled): stop writing the output
+        process.kill()
+        raise
+    finally:
+        process.wait()
+        reader.join()
+    if process.returncode != 0:
+        raise ffmpeg.Error('ffmpeg', None, b''.join(stderr))
+    progress(duration, duration)
+
+def _duration_or_none(media_path):
+    try:
+        return get_media_duration(media_path)
+    except Exception:
+        return None
+
+def extract_audio(video_path, output_audio_path, progress=None):
     """
     Extract audio from video file using ffmpeg
     
     Args:
         video_path: Path to input video file
         output_audio_path: Path where extracted audio will be saved
+        progress: Optional callback progress(seconds_done, duration)
     """
     try:
         stream = ffmpeg.input(video_path)
         stream = ffmpeg.output(stream, output_audio_path, acodec='pcm_s16le', ac=1, ar='16k')
-        ffmpeg.run(stream, overwrite_output=True, quiet=True)
+        duration = _duration_or_none(video_path) if progress is not None else None
+        run_ffmpeg(stream, duration, progress)
+        BYTES_PROCESSED.inc(os.path.getsize(output_audio_path), kind='extracted_audio')
     except ffmpeg.Error as e:
         raise Exception(f"Error extracting audio: {e.stderr.decode() if e.stderr else str(e)}")
 
-def replace_audio_track(video_path, audio_path, output_path):
+def stream_audio(video_path, sample_rate=16000, block_seconds=30):
+    """
+    Decode the audio of a media file through an ffmpeg pipe, without a WAV on disk
+    
+    ffmpeg blocks on the pipe while the consumer is busy, so only about one
+    block is held in memory at a time.
+    
+    Args:
+        video_path: Path to input media file
+        sample_rate: Output sample rate
+        block_seconds: Length of each yielded block in seconds
+    
+    Yields:
+        numpy.ndarray: int16 mono samples
+    """
+    stream = ffmpeg.input(video_path).output('pipe:', format='s16le', acodec='pcm_s16le', ac=1, ar=sample_rate)
+    process = ffmpeg.run_async(stream.global_args('-nostdin'), pipe_stdout=True, pipe_stderr=True)
+    stderr = []
+    reader = threading.Thread(target=lambda: stderr.append(process.stderr.read()), daemon=True)
+    reader.start()
+    block_bytes = int(block_seconds * sample_rate) * 2
+    try:
+        while True:
+            data = process.stdout.read(block_bytes)
+            if not data:
+                break
+            BYTES_PROCESSED.inc(len(data), kind='decoded_audio')
+            yield np.frombuffer(data[:len(data) // 2 * 2], dtype=np.int16)
+        process.wait()
+        reader.join()
+        if process.returncode != 0:
+            raise Exception(f"Error extracting audio: {b''.join(stderr).decode('utf-8', 'replace')}")
+    finally:
+        # The consumer stopped early (e.g. the job was cancelled)
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+def decode_audio(video_path, sample_rate=16000):
+    """
+    Decode the whole audio track of a media file into memory
+    
+    Args:
+        video_path: Path to input media file
+        sample_rate: Output sample rate
+    
+    Returns:
+        numpy.ndarray: int16 mono samples
+    """
+    blocks = list(stream_audio(video_path, sample_rate))
+    return np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.int16)
+
+def get_media_duration(media_path):
+    """
+    Get the duration of a media file in seconds using ffprobe
+    
+    Args:
+        media_path: Path to the media file
+        
+    Returns:
+        float: Duration in seconds
+    """
+    try:
+        probe = ffmpeg.probe(media_path)
+        return float(probe['format']['duration'])
+    except ffmpeg.Error as e:
+        raise Exception(f"Error probing media: {e.stderr.decode() if e.stderr else str(e)}")
+
+_tool_versions = {}
+
+def tool_status(tool):
+    """
+    Check that an FFmpeg binary (ffmpeg or ffprobe) can be found and run
+    
+    A successful check is remembered; a failed one is repeated on the next
+    call, so readiness recovers once the tool is installed.
+    
+    Args:
+        tool: Name of the binary, e.g. 'ffmpeg' or 'ffprobe'
+        
+    Returns:
+        dict: {'available': bool, 'version': first line of <tool> -version or None,
+        'error': str or None}
+    """
+    if tool in _tool_versions:
+        return {'available': True, 'version': _tool_versions[tool], 'error': None}
+    if shutil.which(tool) is None:
+        return {'available': False, 'version': None, 'error': f"{tool} not found on PATH"}
+    try:
+        result = subprocess.run([tool, '-version'], capture_output=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        return {'available': False, 'version': None, 'error': str(e)}
+    if result.returncode != 0:
+        return {'available': False, 'version': None, 'error': f"{tool} -version exited with {result.returncode}"}
+    _tool_versions[tool] = result.stdout.decode('utf-8', 'replace').split('\n', 1)[0].strip()
+    return {'available': True, 'version': _tool_versions[tool], 'error': None}
+
+def ffmpeg_status():
+    """Check that ffmpeg can be found and run (see tool_status)"""
+    return tool_status('ffmpeg')
+
+def ffprobe_status():
+    """Check that ffprobe, used to probe uploads, can be found and run (see tool_status)"""
+    return tool_status('ffprobe')
+
+def _partial_path(output_path):
+    # ffmpeg picks the container from the extension, so it stays last
+    root, ext = os.path.splitext(output_path)
+    return f"{root}.partial{ext}"
+
+def _run_mux(stream, output_path, duration, progress=None):
+    """
+    Run a mux into a partial file and move it over the output when complete
+    
+    An earlier output stays intact while it is being replaced, so a download
+    or ranged read in progress never sees a half-written file.
+    """
+    partial_path = _partial_path(output_path)
+    try:
+        run_ffmpeg(stream, duration, progress)
+    except Exception:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    os.replace(partial_path, output_path)
+    BYTES_PROCESSED.inc(os.path.getsize(output_path), kind='muxed_video')
+
+def _mux_audio(video_path, audio_path, output_path, video_codec, duration, progress=None):
+    video = ffmpeg.input(video_path).video
+    # Pad the dub with silence and cut at the video duration so the output
+    # keeps the original length (-shortest stalls with a stream-copied track)
+    audio = ffmpeg.input(audio_path).audio.filter('apad')
+    stream = ffmpeg.output(
+        video, audio, _partial_path(output_path),
+        vcodec=video_codec,
+        acodec='aac',
+        audio_bitrate='192k',
+        t=duration,
+        # moov atom at the front, so playback can start before the download ends
+        movflags='+faststart'
+    )
+    _run_mux(stream, output_path, duration, progress)
+
+def replace_audio_track(video_path, audio_path, output_path, mode='copy', progress=None):
     """
     Replace the audio track of a video with new audio
     
+    By default the video stream is copied untouched and only the new audio
+    is encoded to AAC. If the source video codec cannot be stored in the
+    output container, the video is re-encoded with libx264 instead.
+    
     Args:
         video_path: Path to original video file
         audio_path: Path to new audio file
         output_path: Path where output video will be saved
+        mode: 'copy' to stream-copy the video track, 'reencode' to force libx264
+        progress: Optional callback progress(seconds_encoded, duration)
     """
+    duration = get_media_duration(video_path)
+    
+    if mode == 'copy':
+        try:
+            _mux_audio(video_path, audio_path, output_path, 'copy', duration, progress)
+            return
+        except ffmpeg.Error:
+            # Codec/container combination does not allow stream copy
+            pass
+    
     try:
-        # Load the video file
-        video = VideoFileClip(video_path)
-        
-        # Load the new audio file
-        audio = AudioFileClip(audio_path)
-        
-        # Set the new audio to the video
-        video_with_new_audio = video.set_audio(audio)
-        
-        # Save the new video file
-        video_with_new_audio.write_videofile(
-            output_path,
-            codec='libx264',
-            audio_codec='aac',
-            temp_audiofile='temp-audio.m4a',
-            remove_temp=True,
-            logger=None  # Suppress moviepy output
-        )
-        
-        # Clean up
-        video.close()
-        audio.close()
-        video_with_new_audio.close()
-        
-    except Exception as e:
-        raise Exception(f"Error replacing audio track: {str(e)}")
+        _mux_audio(video_path, audio_path, output_path, 'libx264', duration, progress)
+    except ffmpeg.Error as e:
+        raise Exception(f"Error replacing audio track: {e.stderr.decode() if e.stderr else str(e)}")
+
+def render_preview(video_path, audio_path, output_path, start, duration, height=360, crf=32, progress=None):
+    """
+    Mux dubbed audio against a small, low-bitrate proxy of part of a video
+    
+    The excerpt from start to start + duration is scaled down to at most
+    height lines and encoded with libx264 at a high CRF, which is quick and
+    small enough to stream while the full-quality render is still to come.
+    
+    Args:
+        video_path: Path to original video file
+        audio_path: Path to the dubbed audio of the excerpt (starting at 0)
+        output_path: Path where the preview will be saved
+        start: Start of the excerpt in seconds
+        duration: Length of the excerpt in seconds
+        height: Maximum height of the proxy in pixels
+        crf: x264 constant rate factor (higher is smaller and blurrier)
+        progress: Optional callback progress(seconds_encoded, duration)
+    
+    Returns:
+        float: Length of the preview in seconds (shorter if the video ends first)
+    """
+    duration = min(duration, get_media_duration(video_path) - start)
+    if duration <= 0:
+        raise Exception("Error rendering preview: the window starts after the end of the video")
+    
+    # Seek on the input so only the excerpt is decoded. The height is
+    # min(ih, height) rounded down to even, written without a comma because
+    # ffmpeg-python does not escape commas in filter arguments
+    video = ffmpeg.input(video_path, ss=start, t=duration).video.filter(
+        'scale', -2, f"trunc((ih+{height}-abs(ih-{height}))/4)*2")
+    audio = ffmpeg.input(audio_path).audio.filter('apad')
+    stream = ffmpeg.output(
+        video, audio, _partial_path(output_path),
+        vcodec='libx264',
+        preset='veryfast',
+        crf=crf,
+        pix_fmt='yuv420p',
+        acodec='aac',
+        audio_bitrate='96k',
+        t=duration,
+        movflags='+faststart'
+    )
+    try:
+        _run_mux(stream, output_path, duration, progress)
+    except ffmpeg.Error as e:
+        raise Exception(f"Error rendering preview: {e.stderr.decode() if e.stderr else str(e)}")
+    return duration
+
+# MP4 stream metadata uses three-letter ISO 639-2 codes
+ISO639_2 = {
+    'en': 'eng', 'es': 'spa', 'fr': 'fra', 'de': 'deu', 'hi': 'hin',
+    'ta': 'tam', 'ar': 'ara', 'zh-cn': 'zho', 'ja': 'jpn', 'ko': 'kor',
+    'pt': 'por', 'ru': 'rus', 'it': 'ita', 'nl': 'nld', 'pl': 'pol',
+    'tr': 'tur', 'vi': 'vie', 'th': 'tha', 'id': 'ind', 'ms': 'msa'
+}
+
+def _mux_tracks(video_path, tracks, output_path, video_codec, duration, progress=None):
+    streams = [ffmpeg.input(video_path).video]
+    options = {}
+    for i, track in enumerate(tracks):
+        streams.append(ffmpeg.input(track['audio']).audio.filter('apad'))
+        language = ISO639_2.get(track['language'], 'und')
+        options[f'metadata:s:a:{i}'] = f'language={language}'
+        options[f'disposition:a:{i}'] = 'default' if i == 0 else '0'
+    subtitles = [track for track in tracks if track.get('subtitle')]
+    for i, track in enumerate(subtitles):
+        streams.append(ffmpeg.input(track['subtitle'])['s'])
+        options[f'metadata:s:s:{i}'] = f"language={ISO639_2.get(track['language'], 'und')}"
+    if subtitles:
+        options['scodec'] = 'mov_text'
+    stream = ffmpeg.output(
+        *streams, _partial_path(output_path),
+        vcodec=video_codec,
+        acodec='aac',
+        audio_bitrate='192k',
+        t=duration,
+        movflags='+faststart',
+        **options
+    )
+    _run_mux(stream, output_path, duration, progress)
+
+def mux_multitrack(video_path, tracks, output_path, mode='copy', progress=None):
+    """
+    Combine a video with several dubbed audio tracks and subtitle streams
+    
+    The video payload is stored once; each language gets its own AAC audio
+    track and mov_text subtitle stream tagged with its language, and the
+    first track is the default one players start with.
+    
+    Args:
+        video_path: Path to original video file
+        tracks: List of dicts with 'language' (code), 'audio' (path) and an
+            optional 'subtitle' (SRT path)
+        output_path: Path where output video will be saved
+        mode: 'copy' to stream-copy the video track, 'reencode' to force libx264
+        progress: Optional callback progress(seconds_encoded, duration)
+    """
+    if not tracks:
+        raise Exception("Error muxing audio tracks: no tracks given")
+    duration = get_media_duration(video_path)
+    
+    if mode == 'copy':
+        try:
+            _mux_tracks(video_path, tracks, output_path, 'copy', duration, progress)
+            return
+        except ffmpeg.Error:
+            pass
+    
+    try:
+        _mux_tracks(video_path, tracks, output_path, 'libx264', duration, progress)
+    except ffmpeg.Error as e:
+        raise Exception(f"Error muxing audio tracks: {e.stderr.decode() if e.stderr else str(e)}")